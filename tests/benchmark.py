@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the public API on synthetic databases of increasing size.
+
+For each size tier, a database is generated with `tests.generate`, and
+every query function of `things.api` is run on it. The time, the number
+of SQL queries, and the peak memory of each call are reported per tier,
+so that the scaling of each function is visible. Results can be saved
+and compared to those of an earlier run to spot regressions.
+
+Examples
+--------
+$ python3 -m tests.benchmark --tasks 1000 10000 100000 --output new.json
+$ python3 -m tests.benchmark --baseline new.json
+"""
+
+import argparse
+import collections.abc
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+import unittest.mock
+
+from tests.generate import generate
+import things
+from things.database import Database
+
+
+# Number of to-dos of each tier.
+TIERS = (1_000, 10_000)
+
+# Function name, positional arguments, and keyword arguments of each
+# benchmark. Arguments naming a sample, see `get_samples`, are replaced
+# by it. `watch` is left out, as it does not return.
+BENCHMARKS = (
+    ("anytime", (), {}),
+    ("areas", (), {}),
+    ("areas", (), {"include_items": True}),
+    ("canceled", (), {}),
+    ("changes", (), {}),
+    ("checklist_items", ("todo",), {}),
+    ("completed", (), {}),
+    ("cursor", ("todo",), {}),
+    ("deadlines", (), {}),
+    ("get", ("project",), {}),
+    ("get_many", ("todos",), {}),
+    ("inbox", (), {}),
+    ("iter_tasks", (), {}),
+    ("last", ("1w",), {}),
+    ("logbook", (), {}),
+    ("projects", (), {}),
+    ("projects", (), {"include_items": True}),
+    ("search", ("milk",), {}),
+    ("someday", (), {}),
+    ("tags", (), {}),
+    ("tags", (), {"include_items": True}),
+    ("tasks", (), {}),
+    ("tasks", (), {"count_only": True}),
+    ("tasks", (), {"include_items": True}),
+    ("today", (), {}),
+    ("todos", (), {}),
+    ("token", (), {}),
+    ("trash", (), {}),
+    ("upcoming", (), {}),
+)
+
+# Factor by which the time may grow before it counts as a regression.
+THRESHOLD = 1.25
+
+
+def get_label(name: str, args: tuple, kwargs: dict) -> str:
+    """
+    Return a readable label of a benchmark.
+
+    Examples
+    --------
+    >>> get_label('tasks', (), {'include_items': True})
+    'tasks(include_items=True)'
+    >>> get_label('last', ('1w',), {})
+    "last('1w')"
+    """
+    arguments = [repr(arg) for arg in args]
+    arguments += [f"{key}={value!r}" for key, value in kwargs.items()]
+    return f"{name}({', '.join(arguments)})"
+
+
+def get_parameters(tasks: int) -> Dict[str, int]:
+    """Return the parameters of `tests.generate.generate` for a tier."""
+    return {
+        "areas": max(1, tasks // 100),
+        "projects": max(1, tasks // 20),
+        "headings": max(1, tasks // 10),
+        "tasks": tasks,
+        "tags": max(10, tasks // 500),
+        "recurring": max(1, tasks // 100),
+    }
+
+
+def get_samples(database: Database) -> Dict:
+    """Return uuids to pass to the functions that need them."""
+    todos = things.todos(database=database, fields=["uuid", "checklist"])
+    return {
+        "project": things.projects(database=database, fields="uuid")[0]["uuid"],
+        "todo": next(todo["uuid"] for todo in todos if todo.get("checklist")),
+        "todos": [todo["uuid"] for todo in todos[:100]],
+    }
+
+
+def measure(
+    database: Database, name: str, args: tuple, kwargs: dict, repeat: int
+) -> Dict:
+    """
+    Return the time, queries, and peak memory of calling a function.
+
+    The time is the median of `repeat` calls without memory tracing.
+    Queries are counted at `Database.print_query`, which is called for
+    every query, whether it is read at once or in batches.
+    """
+    function = getattr(things, name)
+
+    def call():
+        result = function(*args, database=database, **kwargs)
+        if isinstance(result, collections.abc.Iterator):
+            for _ in result:
+                pass
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+
+    with unittest.mock.patch.object(
+        database, "print_query", wraps=database.print_query
+    ) as print_query:
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        tracemalloc.clear_traces()
+        try:
+            call()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+
+    return {
+        "time": statistics.median(times),
+        "queries": print_query.call_count,
+        "memory": peak,
+    }
+
+
+def run(
+    tiers=TIERS, repeat: int = 3, directory: Optional[str] = None
+) -> Dict[str, Dict[str, Dict]]:
+    """
+    Run all benchmarks on each tier.
+
+    Databases are generated in `directory` and reused by later runs.
+    By default, they are generated in a temporary directory.
+
+    Returns
+    -------
+    dict
+        Maps each tier, as str, to a dict mapping labels of benchmarks
+        to their time in seconds, number of queries, and peak memory in
+        bytes.
+    """
+    if directory is None:
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            return run(tiers, repeat, temporary_directory)
+
+    results = {}
+    for tasks in tiers:
+        filepath = os.path.join(directory, f"main-{tasks}.sqlite")
+        if not os.path.exists(filepath):
+            generate(filepath, **get_parameters(tasks))
+        database = Database(filepath=filepath)
+        try:
+            samples = get_samples(database)
+            results[str(tasks)] = {
+                get_label(name, args, kwargs): measure(
+                    database,
+                    name,
+                    tuple(samples.get(arg, arg) for arg in args),
+                    kwargs,
+                    repeat,
+                )
+                for name, args, kwargs in BENCHMARKS
+            }
+        finally:
+            database.close()
+    return results
+
+
+def find_regressions(results, baseline, threshold: float = THRESHOLD) -> List[str]:
+    """
+    Return descriptions of benchmarks that got slower or run more queries.
+
+    Examples
+    --------
+    >>> baseline = {'10': {'inbox()': {'time': 1.0, 'queries': 1}}}
+    >>> results = {'10': {'inbox()': {'time': 2.0, 'queries': 2}}}
+    >>> find_regressions(results, baseline)
+    ['inbox() on 10 tasks: 2.00x time, 1 -> 2 queries']
+    """
+    regressions = []
+    for tier, benchmarks in results.items():
+        for label, result in benchmarks.items():
+            before = baseline.get(tier, {}).get(label)
+            if before is None:
+                continue
+            factor = result["time"] / before["time"] if before["time"] else 1.0
+            if factor > threshold or result["queries"] > before["queries"]:
+                regressions.append(
+                    f"{label} on {tier} tasks: {factor:.2f}x time, "
+                    f"{before['queries']} -> {result['queries']} queries"
+                )
+    return regressions
+
+
+def format_table(results) -> str:
+    """Return the results as a table with a column per tier."""
+    tiers = list(results)
+    labels = list(dict.fromkeys(label for tier in tiers for label in results[tier]))
+    width = max(len(label) for label in labels)
+    lines = [
+        " " * width + "".join(f"{tier + ' tasks':>27}" for tier in tiers),
+        " " * width + "       ms  queries      KiB" * len(tiers),
+    ]
+    for label in labels:
+        cells = [
+            f"{result['time'] * 1000:8.1f} {result['queries']:8d} "
+            f"{result['memory'] / 1024:8.0f}"
+            for result in (results[tier][label] for tier in tiers)
+        ]
+        lines.append(f"{label:<{width}}" + "".join(f" {cell}" for cell in cells))
+    return "\n".join(lines)
+
+
+def main(arguments=None) -> int:
+    """Parse the command line, run the benchmarks, and report them."""
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n", maxsplit=1)[0].strip()
+    )
+    parser.add_argument(
+        "--tasks", type=int, nargs="+", default=TIERS, help="number of to-dos per tier"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="calls per benchmark")
+    parser.add_argument("--directory", help="directory to keep the databases in")
+    parser.add_argument("--output", help="JSON file to save the results to")
+    parser.add_argument("--baseline", help="JSON file of results to compare to")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    options = parser.parse_args(arguments)
+
+    results = run(options.tasks, options.repeat, options.directory)
+    print(format_table(results))
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    if options.baseline:
+        with open(options.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        regressions = find_regressions(results, baseline, options.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
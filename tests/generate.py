@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+
+"""
+Generate synthetic Things databases of configurable size.
+
+The schema, including its indexes, and the settings are copied from the
+test database, so that the generated files look like those of the
+Things app. The content is random, but reproducible with `seed`.
+
+Examples
+--------
+$ python3 -m tests.generate /tmp/main.sqlite --tasks 100000
+"""
+
+import argparse
+import datetime
+import inspect
+import os
+import random
+import sqlite3
+import string
+import time
+from typing import Dict, List, Optional
+
+from things.database import (
+    TABLE_AREA,
+    TABLE_AREATAG,
+    TABLE_CHECKLIST_ITEM,
+    TABLE_META,
+    TABLE_SETTINGS,
+    TABLE_TAG,
+    TABLE_TASK,
+    TABLE_TASKTAG,
+    isodate_to_yyyyyyyyyyymmmmddddd,
+)
+
+
+TEMPLATE_FILEPATH = os.path.join(os.path.dirname(__file__), "main.sqlite")
+
+UUID_ALPHABET = string.ascii_letters + string.digits
+WORDS = (
+    "buy call check clean email fix milk plan read review send ship "
+    "book budget draft garden invoice meeting notes report taxes trip"
+).split()
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# Minimal recurrence rule, used if the template has no repeating to-do.
+RECURRENCE_RULE = b"""<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" \
+"http://www.apple.com/DTDs/PropertyList-1.0.dtd">
+<plist version="1.0">
+<dict>
+\t<key>fu</key>
+\t<integer>16</integer>
+\t<key>fa</key>
+\t<integer>1</integer>
+</dict>
+</plist>
+"""
+
+
+def generate(  # pylint: disable=R0913,R0914,R0917
+    filepath: str,
+    areas: int = 10,
+    projects: int = 50,
+    headings: int = 100,
+    tasks: int = 1000,
+    tags: int = 20,
+    tags_per_task: int = 1,
+    checklist_items: int = 2,
+    notes_length: int = 100,
+    recurring: int = 10,
+    seed: int = 0,
+    template: str = TEMPLATE_FILEPATH,
+) -> None:
+    """
+    Write a synthetic Things database.
+
+    Parameters
+    ----------
+    filepath : str
+        Path of the database file to create. It must not exist yet.
+
+    areas, projects, headings, tasks, tags : int
+        Number of areas, projects, headings, to-dos, and tags. Projects
+        and to-dos are spread over areas, projects, and headings, and
+        have a mix of start, status, dates, and trashed state.
+
+    tags_per_task : int, default 1
+        Average number of tags of each area, project, and to-do.
+
+    checklist_items : int, default 2
+        Average number of checklist items of each to-do.
+
+    notes_length : int, default 100
+        Average length of the notes of projects and to-dos.
+
+    recurring : int, default 10
+        Number of repeating to-dos. Each has a template, which the API
+        does not return, and an instance.
+
+    seed : int, default 0
+        Seed of the random content.
+
+    template : str, default `TEMPLATE_FILEPATH`
+        Database to copy the schema and the settings from, by default
+        the test database next to this module.
+    """
+    if os.path.exists(filepath):
+        raise ValueError(f"Database already exists: {filepath!r}")
+
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    now = time.time()
+
+    connection = sqlite3.connect(f"file:{filepath}?mode=rwc", uri=True)
+    try:
+        with connection:
+            recurrence_rule = copy_schema(connection, template)
+
+            area_uuids = insert_areas(connection, rng, areas)
+            tag_uuids = insert_tags(connection, rng, tags)
+            project_rows = [
+                make_task_row(rng, today, now, notes_length, type=1, area=area)
+                for area in choose_containers(rng, projects, area_uuids)
+            ]
+            heading_rows = [
+                make_task_row(rng, today, now, 0, type=2, project=project, start=1)
+                for project in choose_containers(rng, headings, uuids(project_rows))
+            ]
+            todo_rows = [
+                make_task_row(rng, today, now, notes_length, **container)
+                for container in choose_todo_containers(
+                    rng, tasks, area_uuids, project_rows, heading_rows
+                )
+            ]
+            todo_rows += make_recurring_rows(
+                rng, today, now, recurring, recurrence_rule
+            )
+            insert_tasks(connection, project_rows + heading_rows + todo_rows)
+
+            insert_links(
+                connection, rng, TABLE_AREATAG, area_uuids, tag_uuids, tags_per_task
+            )
+            tagged = uuids(project_rows) + uuids(todo_rows)
+            insert_links(
+                connection, rng, TABLE_TASKTAG, tagged, tag_uuids, tags_per_task
+            )
+            insert_checklist_items(
+                connection, rng, now, uuids(todo_rows), checklist_items
+            )
+            update_counts(connection)
+    finally:
+        connection.close()
+
+
+def choose_containers(rng, count: int, container_uuids: List[str]) -> list:
+    """Return `count` random containers, or None if there are none."""
+    return [
+        rng.choice(container_uuids) if container_uuids else None for _ in range(count)
+    ]
+
+
+def choose_todo_containers(  # pylint: disable=R0913
+    rng, count: int, area_uuids, project_rows, heading_rows
+) -> List[Dict]:
+    """
+    Return the area, project, or heading of `count` to-dos.
+
+    To-dos under a heading only refer to the heading, like in Things.
+    To-dos without any of those are in the Inbox, Anytime, or Someday.
+    """
+    containers = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.2 and heading_rows:
+            containers.append({"heading": rng.choice(heading_rows)["uuid"]})
+        elif kind < 0.6 and project_rows:
+            containers.append({"project": rng.choice(project_rows)["uuid"]})
+        elif kind < 0.8 and area_uuids:
+            containers.append({"area": rng.choice(area_uuids)})
+        else:
+            containers.append({"start": rng.choice((0, 0, 1, 2))})
+    return containers
+
+
+def copy_schema(connection, template: str) -> bytes:
+    """
+    Create the tables of `template` and copy its metadata and settings.
+
+    Return a recurrence rule of `template` to reuse.
+    """
+    source = sqlite3.connect(f"file:{template}?mode=ro", uri=True)
+    try:
+        schema = source.execute("""
+            SELECT sql FROM sqlite_master
+            WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'
+            ORDER BY type = 'index', rowid
+            """).fetchall()
+        for (sql,) in schema:
+            connection.execute(sql)
+        for table in (TABLE_META, TABLE_SETTINGS):
+            rows = source.execute(f"SELECT * FROM {table}").fetchall()
+            if rows:
+                placeholders = ", ".join("?" * len(rows[0]))
+                connection.executemany(
+                    f"INSERT INTO {table} VALUES ({placeholders})", rows
+                )
+        (recurrence_rule,) = source.execute(
+            f"""
+            SELECT IFNULL(MAX(rt1_recurrenceRule), ?) FROM {TABLE_TASK}
+            """,
+            (RECURRENCE_RULE,),
+        ).fetchone()
+    finally:
+        source.close()
+    return recurrence_rule
+
+
+def insert_areas(connection, rng, count: int) -> List[str]:
+    """Insert `count` areas and return their uuids."""
+    rows = [(make_uuid(rng), make_title(rng, 2), 1, index) for index in range(count)]
+    connection.executemany(
+        f"""
+        INSERT INTO {TABLE_AREA} (uuid, title, visible, "index") VALUES (?, ?, ?, ?)
+        """,
+        rows,
+    )
+    return [row[0] for row in rows]
+
+
+def insert_checklist_items(  # pylint: disable=R0913
+    connection, rng, now: float, todo_uuids: List[str], average: int
+) -> None:
+    """Insert on average `average` checklist items per to-do."""
+    rows = []
+    for todo_uuid in todo_uuids:
+        for index in range(rng.randint(0, 2 * average)):
+            status = rng.choice((0, 0, 2, 3))
+            created = now - rng.uniform(0, 365 * SECONDS_PER_DAY)
+            rows.append(
+                (
+                    make_uuid(rng),
+                    created,
+                    created,
+                    make_title(rng, 3),
+                    status,
+                    created if status else None,
+                    index,
+                    todo_uuid,
+                    0,
+                )
+            )
+    connection.executemany(
+        f"""
+        INSERT INTO {TABLE_CHECKLIST_ITEM} (
+            uuid, userModificationDate, creationDate, title, status, stopDate,
+            "index", task, leavesTombstone
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        rows,
+    )
+
+
+def insert_links(  # pylint: disable=R0913,R0917
+    connection, rng, table: str, uuids_: List[str], tag_uuids: List[str], average: int
+) -> None:
+    """Link each of `uuids_` to on average `average` random tags."""
+    rows = [
+        (uuid, tag_uuid)
+        for uuid in uuids_
+        for tag_uuid in rng.sample(
+            tag_uuids, min(len(tag_uuids), rng.randint(0, 2 * average))
+        )
+    ]
+    column = "areas" if table == TABLE_AREATAG else "tasks"
+    connection.executemany(f"INSERT INTO {table} ({column}, tags) VALUES (?, ?)", rows)
+
+
+def insert_tags(connection, rng, count: int) -> List[str]:
+    """Insert `count` tags with unique titles and return their uuids."""
+    rows = [
+        (make_uuid(rng), f"{rng.choice(WORDS)}-{index}", index)
+        for index in range(count)
+    ]
+    connection.executemany(
+        f'INSERT INTO {TABLE_TAG} (uuid, title, "index") VALUES (?, ?, ?)', rows
+    )
+    return [row[0] for row in rows]
+
+
+def insert_tasks(connection, rows: List[Dict]) -> None:
+    """Insert to-dos, projects, and headings given as dicts of columns."""
+    columns = [
+        name for _, name, *_ in connection.execute(f"PRAGMA table_info({TABLE_TASK})")
+    ]
+    placeholders = ", ".join("?" * len(columns))
+    quoted_columns = ", ".join(f'"{column}"' for column in columns)
+    connection.executemany(
+        f"INSERT INTO {TABLE_TASK} ({quoted_columns}) VALUES ({placeholders})",
+        ([row.get(column) for column in columns] for row in rows),
+    )
+
+
+def make_recurring_rows(  # pylint: disable=R0913
+    rng, today, now: float, count: int, recurrence_rule: bytes
+) -> List[Dict]:
+    """Return templates of repeating to-dos, each with one instance."""
+    rows = []
+    for _ in range(count):
+        template = make_task_row(rng, today, now, 0, start=2, status=0, trashed=0)
+        template.update(
+            startDate=None,
+            rt1_recurrenceRule=recurrence_rule,
+            rt1_nextInstanceStartDate=isodate_to_yyyyyyyyyyymmmmddddd(
+                str(today + datetime.timedelta(days=rng.randint(1, 30)))
+            ),
+        )
+        instance = make_task_row(rng, today, now, 0, start=1, status=0, trashed=0)
+        instance.update(title=template["title"], rt1_repeatingTemplate=template["uuid"])
+        rows += [template, instance]
+    return rows
+
+
+def make_task_row(  # pylint: disable=R0913
+    rng, today, now: float, notes_length: int, **columns
+) -> Dict:
+    """
+    Return a random to-do, project, or heading as a dict of columns.
+
+    `columns` overrides the random values, e.g., `type=1` for a project.
+    """
+    created = now - rng.uniform(0, 365 * SECONDS_PER_DAY)
+    modified = rng.uniform(created, now)
+    status = rng.choice((0, 0, 0, 0, 0, 0, 2, 3, 3, 3))
+    start = columns.get("start", rng.choice((1, 1, 1, 2)))
+    row = {
+        "uuid": make_uuid(rng),
+        "leavesTombstone": 0,
+        "creationDate": created,
+        "userModificationDate": modified,
+        "type": 0,
+        "status": status,
+        "stopDate": modified if status else None,
+        "trashed": int(rng.random() < 0.02),
+        "title": make_title(rng, rng.randint(1, 5)),
+        "notes": make_text(rng, rng.randint(0, 2 * notes_length)),
+        "notesSync": 0,
+        "start": start,
+        "startDate": make_random_date(rng, today, start),
+        "startBucket": 0,
+        "deadline": (
+            make_thingsdate(today, rng.randint(-30, 60)) if rng.random() < 0.1 else None
+        ),
+        "index": rng.randint(-10000, 10000),
+        "todayIndex": rng.randint(-10000, 10000),
+        "untrashedLeafActionsCount": 0,
+        "openUntrashedLeafActionsCount": 0,
+        "checklistItemsCount": 0,
+        "openChecklistItemsCount": 0,
+        "rt1_instanceCreationPaused": 0,
+        "rt1_instanceCreationCount": 0,
+    }
+    row.update(columns)
+    if row["startDate"] is not None:
+        row["todayIndexReferenceDate"] = row["startDate"]
+    if rng.random() < 0.05 and row["startDate"] is not None:
+        row["reminderTime"] = rng.randint(0, 23) << 26 | rng.randint(0, 59) << 20
+    return row
+
+
+def make_random_date(rng, today, start: int) -> Optional[int]:
+    """
+    Return a random start date for `start`, or None.
+
+    Some Anytime to-dos are in Today, some Someday ones in Upcoming.
+    """
+    if start == 1 and rng.random() < 0.2:
+        return make_thingsdate(today, rng.randint(-7, 0))
+    if start == 2 and rng.random() < 0.3:
+        return make_thingsdate(today, rng.randint(1, 90))
+    return None
+
+
+def make_text(rng, length: int) -> str:
+    """Return random words of about `length` characters."""
+    words: List[str] = []
+    while sum(len(word) + 1 for word in words) < length:
+        words.append(rng.choice(WORDS))
+    return " ".join(words)
+
+
+def make_thingsdate(today, days: int) -> int:
+    """
+    Return the date `days` after `today`, as stored by Things.
+
+    Examples
+    --------
+    >>> make_thingsdate(datetime.date(2021, 3, 27), 1)
+    132464128
+    """
+    return isodate_to_yyyyyyyyyyymmmmddddd(str(today + datetime.timedelta(days=days)))
+
+
+def make_title(rng, words: int) -> str:
+    """Return a capitalized title of `words` random words."""
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def make_uuid(rng) -> str:
+    """Return a random uuid in the format of Things."""
+    return "".join(rng.choice(UUID_ALPHABET) for _ in range(22))
+
+
+def update_counts(connection) -> None:
+    """Set the cached counts of items of projects and to-dos, like Things does."""
+    connection.execute(f"""
+        UPDATE {TABLE_TASK} SET
+            checklistItemsCount = (
+                SELECT COUNT(*) FROM {TABLE_CHECKLIST_ITEM} WHERE task = {TABLE_TASK}.uuid
+            ),
+            openChecklistItemsCount = (
+                SELECT COUNT(*) FROM {TABLE_CHECKLIST_ITEM}
+                WHERE task = {TABLE_TASK}.uuid AND status = 0
+            )
+        WHERE type = 0
+        """)
+    connection.execute(f"""
+        UPDATE {TABLE_TASK} SET
+            untrashedLeafActionsCount = (
+                SELECT COUNT(*) FROM {TABLE_TASK} AS TODO
+                WHERE TODO.type = 0 AND NOT TODO.trashed AND (
+                    TODO.project = {TABLE_TASK}.uuid OR TODO.heading IN (
+                        SELECT uuid FROM {TABLE_TASK} AS HEADING
+                        WHERE HEADING.project = {TABLE_TASK}.uuid
+                    )
+                )
+            ),
+            openUntrashedLeafActionsCount = (
+                SELECT COUNT(*) FROM {TABLE_TASK} AS TODO
+                WHERE TODO.type = 0 AND NOT TODO.trashed AND TODO.status = 0 AND (
+                    TODO.project = {TABLE_TASK}.uuid OR TODO.heading IN (
+                        SELECT uuid FROM {TABLE_TASK} AS HEADING
+                        WHERE HEADING.project = {TABLE_TASK}.uuid
+                    )
+                )
+            )
+        WHERE type = 1
+        """)
+
+
+def uuids(rows: List[Dict]) -> List[str]:
+    """Return the uuids of rows."""
+    return [row["uuid"] for row in rows]
+
+
+def main(arguments=None) -> None:
+    """Parse the command line and generate a database."""
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n", maxsplit=1)[0].strip()
+    )
+    parser.add_argument("filepath", help="database file to create")
+    for name, parameter in inspect.signature(generate).parameters.items():
+        if parameter.default is not inspect.Parameter.empty:
+            option = "--" + name.replace("_", "-")
+            default = parameter.default
+            parser.add_argument(option, type=type(default), default=default)
+    generate(**vars(parser.parse_args(arguments)))
+
+
+if __name__ == "__main__":
+    main()
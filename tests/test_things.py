@@ -2,17 +2,32 @@
 
 """Module documentation goes here."""
 
+# pylint: disable=C0302
+
+import asyncio
+import concurrent.futures
 import contextlib
+import datetime
+import functools
 import io
 import os
+import shutil
 import sqlite3
+import tempfile
+import threading
 import time
 import tracemalloc
 import unittest
 import unittest.mock
 
 import things
+import things.aio
 import things.database
+import things.fts
+import things.multi
+import things.watcher
+import tests.benchmark
+import tests.generate
 
 
 tracemalloc.start()
@@ -48,6 +63,23 @@ TODAY_TASKS = 4
 TODAY = TODAY_PROJECTS + TODAY_TASKS
 
 
+@contextlib.contextmanager
+def copy_test_database():
+    """Yield the filepath of a temporary copy of the test database."""
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = os.path.join(directory, "main.sqlite")
+        shutil.copy(TEST_DATABASE_FILEPATH, filepath)
+        yield filepath
+
+
+def write_database(filepath, sql_query, parameters=()):
+    """Run a SQL statement on a database, as the Things app would."""
+    connection = sqlite3.connect(filepath)
+    with connection:
+        connection.execute(sql_query, parameters)
+    connection.close()
+
+
 class ThingsCase(unittest.TestCase):  # pylint: disable=R0904
     """Class documentation goes here."""
 
@@ -97,6 +129,292 @@ class ThingsCase(unittest.TestCase):  # pylint: disable=R0904
         #   "Canceled To-Do in Heading"
         self.assertEqual(HEADINGS, len(todos))
 
+    def test_search_index(self):
+        database = things.Database()
+        with tempfile.TemporaryDirectory() as directory, unittest.mock.patch.dict(
+            os.environ, {"XDG_CACHE_HOME": directory}
+        ):
+            self.assertIsNone(things.fts.SearchIndex.find(database))
+            index = things.fts.SearchIndex.find(database, create=True)
+            self.assertIs(index, things.fts.SearchIndex.find(database))
+
+            todos = things.search("to-do heading", database=database, status=None)
+            self.assertEqual(HEADINGS, len(todos))
+            self.assertEqual(
+                HEADINGS,
+                things.search("to-do head", count_only=True, status=None),
+            )
+            self.assertEqual([], things.search("invalid_query", database=database))
+            self.assertEqual(0, index.sync(database))
+
+            # `limit` applies to all results, not to each chunk of uuids.
+            todos = things.search("to-do", database=database, status=None)
+            chunked = functools.partial(things.database.chunked, size=2)
+            with unittest.mock.patch("things.api.chunked", chunked):
+                self.assertEqual(
+                    todos[:3],
+                    things.search("to-do", database=database, status=None, limit=3),
+                )
+                self.assertEqual(
+                    3,
+                    things.search("to-do", database=database, count_only=True, limit=3),
+                )
+            with self.assertRaises(ValueError):
+                things.search("to-do", database=database, order_by="title")
+
+    def test_search_index_sync(self):
+        with copy_test_database() as filepath:
+            database = things.Database(filepath=filepath)
+            index = things.fts.SearchIndex(
+                os.path.join(os.path.dirname(filepath), "search.sqlite")
+            )
+            self.assertEqual(50, index.sync(database))
+
+            write_database(
+                filepath,
+                "UPDATE TMTask SET title = 'Zeppelin', userModificationDate = ? "
+                "WHERE uuid = 'DfYoiXcNLQssk9DkSoJV3Y'",
+                (time.time(),),
+            )
+            self.assertLess(0, index.sync(database))
+            self.assertEqual(["DfYoiXcNLQssk9DkSoJV3Y"], index.search("zepp"))
+            database.close()
+
+    def test_changes(self):
+        with copy_test_database() as filepath:
+            database = things.Database(filepath=filepath)
+            result = things.changes(database=database)
+            self.assertEqual(50, len(result["tasks"]))
+            self.assertEqual(3, len(result["areas"]))
+            self.assertEqual([], result["deleted"])
+
+            now = time.time()
+            write_database(
+                filepath,
+                "UPDATE TMTask SET title = 'Zeppelin', userModificationDate = ? "
+                "WHERE uuid = 'DfYoiXcNLQssk9DkSoJV3Y'",
+                (now,),
+            )
+            write_database(
+                filepath,
+                "UPDATE TMArea SET title = 'Area Z' "
+                "WHERE uuid = 'Y3JC4XeyGWxzDocQL4aobo'",
+            )
+            write_database(
+                filepath, "INSERT INTO TMTombstone VALUES ('T', ?, 'Deleted')", (now,)
+            )
+            result = things.changes(result["watermark"], database=database)
+            tasks = {task["uuid"]: task for task in result["tasks"]}
+            self.assertEqual("Zeppelin", tasks["DfYoiXcNLQssk9DkSoJV3Y"]["title"])
+            self.assertEqual(["Area Z"], [area["title"] for area in result["areas"]])
+            self.assertTrue(
+                all(
+                    task["area_title"] == "Area Z"
+                    for task in things.tasks(
+                        area="Y3JC4XeyGWxzDocQL4aobo", database=database
+                    )
+                )
+            )
+            self.assertLessEqual(
+                {
+                    task["uuid"]
+                    for task in things.tasks(
+                        area="Y3JC4XeyGWxzDocQL4aobo", database=database
+                    )
+                },
+                set(tasks),
+            )
+            self.assertEqual(["Deleted"], result["deleted"])
+
+            result = things.changes(result["watermark"], database=database)
+            self.assertEqual([], result["areas"])
+            self.assertLess(len(result["tasks"]), 50)
+            database.close()
+
+        with self.assertRaises(ValueError):
+            things.changes("invalid")
+
+    def test_watch(self):
+        with copy_test_database() as filepath:
+
+            def write(title):
+                write_database(filepath, "UPDATE TMTask SET title = ?", (title,))
+
+            watcher = things.watcher.Watcher(filepath, interval=0.01, debounce=0)
+            self.assertIsNone(watcher.poll())
+            write("A")
+            event = watcher.poll()
+            self.assertEqual(filepath, event.filepath)  # type: ignore
+            self.assertIsNone(watcher.poll())
+            watcher.stop()
+
+            events = []
+            received = threading.Event()
+            with things.watch(
+                lambda event: events.append(event) or received.set(),
+                interval=0.01,
+                debounce=0.2,
+                filepath=filepath,
+            ):
+                write("B")
+                write("C")
+                self.assertTrue(received.wait(5))
+            self.assertEqual(1, len(events))
+
+            async def next_event():
+                watcher = things.watch(interval=0.01, debounce=0, filepath=filepath)
+                write("D")
+                async for event in watcher:
+                    watcher.stop()
+                    return event
+                return None
+
+            self.assertIsNotNone(asyncio.run(next_event()))
+
+    def test_aio(self):
+        async def read():
+            return await asyncio.gather(things.aio.today(), things.aio.tasks())
+
+        _today, tasks = asyncio.run(read())
+        self.assertEqual(things.tasks(), tasks)
+        with self.assertRaises(ValueError):
+            asyncio.run(things.aio.tasks(database=things.Database()))
+        database = things.Database(thread_safe=True)
+        self.assertEqual(tasks, asyncio.run(things.aio.tasks(database=database)))
+
+    def test_aio_single_flight(self):
+        calls = []
+
+        def slow(database=None):
+            calls.append(database)
+            time.sleep(0.05)
+            return [{"title": "A"}]
+
+        async def read():
+            return await asyncio.gather(*(things.aio.run(slow) for _ in range(3)))
+
+        results = asyncio.run(read())
+        self.assertEqual(1, len(calls))
+        self.assertEqual([[{"title": "A"}]] * 3, results)
+        self.assertIsNot(results[0], results[1])
+
+        async def read_and_modify():
+            async def modify():
+                result = await things.aio.run(slow)
+                result[0]["title"] = "modified"
+                await asyncio.sleep(0)
+                return result
+
+            return await asyncio.gather(modify(), things.aio.run(slow))
+
+        modified, result = asyncio.run(read_and_modify())
+        self.assertEqual("modified", modified[0]["title"])
+        self.assertEqual([{"title": "A"}], result)
+
+    def test_aio_cancel(self):
+        interrupted = threading.Event()
+
+        def endless(database=None):
+            try:
+                database.connection.execute(  # type: ignore
+                    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) "
+                    "SELECT count(*) FROM c"
+                ).fetchall()
+            except sqlite3.OperationalError:
+                interrupted.set()
+
+        async def cancel():
+            task = asyncio.ensure_future(things.aio.run(endless))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            return await things.aio.inbox()
+
+        self.assertEqual(things.inbox(), asyncio.run(cancel()))
+        self.assertTrue(interrupted.wait(5))
+
+    def test_database_thread_safe(self):
+        database = things.Database(thread_safe=True, cache_size=8)
+        expected = things.tasks(include_items=True)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(
+                executor.map(
+                    lambda _: things.tasks(include_items=True, database=database),
+                    range(16),
+                )
+            )
+            connection = executor.submit(lambda: database.connection).result()
+        self.assertEqual([expected] * 16, results)
+        self.assertIsNot(database.connection, connection)
+        self.assertIs(database.connection, database.connection)
+
+        # Connections of threads are closed when their thread exits.
+        connections = []
+        thread = threading.Thread(
+            target=lambda: connections.append(database.connection)
+        )
+        thread.start()
+        thread.join()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            connections[0].execute("SELECT 1")
+        database.close()
+        with self.assertRaises(ValueError):
+            things.Database(thread_safe=True, snapshot=True)
+
+    def test_multi(self):
+        filepaths = [TEST_DATABASE_FILEPATH, "missing.sqlite", TEST_DATABASE_FILEPATH]
+        for processes in (False, True):
+            results = list(
+                things.multi.run(
+                    filepaths,
+                    "tasks",
+                    status="completed",
+                    count_only=True,
+                    max_workers=2,
+                    processes=processes,
+                )
+            )
+            self.assertEqual(sorted(filepaths), sorted(r.filepath for r in results))
+            values = [result.value for result in results if result.error is None]
+            self.assertEqual([12, 12], values)
+            (failure,) = [result for result in results if result.error is not None]
+            self.assertEqual("missing.sqlite", failure.filepath)
+
+        results = things.multi.run([TEST_DATABASE_FILEPATH], things.api.inbox)
+        self.assertEqual(things.inbox(), next(results).value)
+        with self.assertRaises(ValueError):
+            things.multi.run(filepaths, "invalid")
+
+    def test_generate(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "main.sqlite")
+            tests.generate.generate(
+                filepath, areas=2, projects=3, headings=4, tasks=50, tags=5, recurring=2
+            )
+            with self.assertRaises(ValueError):
+                tests.generate.generate(filepath)
+
+            database = things.Database(filepath=filepath)
+            kwargs = {"status": None, "trashed": None, "database": database}
+            self.assertEqual(52, things.todos(count_only=True, **kwargs))
+            self.assertEqual(3, things.projects(count_only=True, **kwargs))
+            self.assertEqual(2, len(things.areas(database=database)))
+            self.assertEqual(5, len(things.tags(database=database)))
+            self.assertEqual(things.token(), things.token(database=database))
+            database.close()
+
+            results = tests.benchmark.run([20], repeat=1, directory=directory)
+            names = {name for name, _, _ in tests.benchmark.BENCHMARKS}
+            self.assertLessEqual(set(things.multi.FUNCTIONS), names)
+            for result in results["20"].values():
+                self.assertGreaterEqual(result["queries"], 1)
+            # Queries read in batches are counted as well.
+            self.assertEqual(
+                results["20"]["tasks()"]["queries"],
+                results["20"]["iter_tasks()"]["queries"],
+            )
+
     def test_inbox(self):
         tasks = things.inbox()
         self.assertEqual(INBOX, len(tasks))
@@ -158,6 +476,17 @@ class ThingsCase(unittest.TestCase):  # pylint: disable=R0904
         for count, value in enumerate(tasks_today):
             self.assertEqual(value, tasks[count]["title"])
 
+    def test_today_single_query(self):
+        database = things.Database()
+        with unittest.mock.patch.object(
+            database, "get_tasks", wraps=database.get_tasks
+        ) as get_tasks:
+            tasks = things.today(database=database)
+        self.assertEqual(1, get_tasks.call_count)
+        keys = [(task["today_index"], task["start_date"] or "") for task in tasks]
+        self.assertEqual(sorted(keys), keys)
+        self.assertEqual(len(tasks), things.today(count_only=True))
+
     def test_checklist(self):
         checklist_items = things.checklist_items("3Eva4XFof6zWb9iSfYy4ej")
         self.assertEqual(3, len(checklist_items))
@@ -181,6 +510,35 @@ class ThingsCase(unittest.TestCase):  # pylint: disable=R0904
         tasks = things.logbook(stop_date="=2021-03-27")
         self.assertEqual(0, len(tasks))
 
+    def test_logbook_pages(self):
+        tasks = things.logbook()
+        stop_dates = [task["stop_date"] for task in tasks]
+        self.assertEqual(sorted(stop_dates, reverse=True), stop_dates)
+
+        page = things.logbook(limit=4)
+        self.assertEqual(tasks[:4], page)
+        next_page = things.logbook(limit=4, after=things.cursor(page[-1]))
+        self.assertEqual(tasks[4:8], next_page)
+        # The pages are split between tasks stopped at the same time.
+        self.assertEqual(page[-1]["stop_date"], next_page[0]["stop_date"])
+        self.assertEqual([], things.logbook(after=things.cursor(tasks[-1])))
+
+        with self.assertRaises(ValueError):
+            things.logbook(limit=-1)
+        with self.assertRaises(ValueError):
+            things.logbook(after="yesterday")
+        with self.assertRaises(ValueError):
+            things.tasks(order_by="-invalid")
+
+        database = things.Database()
+        with unittest.mock.patch.object(
+            database, "execute_query", wraps=database.execute_query
+        ) as execute_query:
+            things.logbook(limit=5, database=database)
+        sql_query, parameters = execute_query.call_args_list[0].args
+        plan = database.execute_query(f"EXPLAIN QUERY PLAN {sql_query}", parameters)
+        self.assertTrue(any("index_TMTask_stopDate" in row["detail"] for row in plan))
+
     def test_canceled(self):
         tasks = things.canceled()
         self.assertEqual(11, len(tasks))
@@ -201,6 +559,20 @@ class ThingsCase(unittest.TestCase):  # pylint: disable=R0904
         task = things.get("Qt2AY87x2QDdowSn9HKTt1")
         self.assertEqual(4, len(task.keys()))  # type: ignore
 
+    def test_get_many(self):
+        uuids = [
+            task["uuid"]
+            for task in things.tasks(status=None, trashed=None, context_trashed=None)
+        ]
+        uuids += [area["uuid"] for area in things.areas()]
+        uuids += [tag["uuid"] for tag in things.tags()]
+        uuids += ["invalid_uuid", "3Eva4XFof6zWb9iSfYy4ej"]
+        objects = things.get_many(uuids)
+        expected = {uuid: things.get(uuid) for uuid in uuids if things.get(uuid)}
+        self.assertEqual(expected, objects)
+        self.assertEqual(list(expected), list(objects))
+        self.assertEqual({}, things.get_many([]))
+
     def test_todos(self):
         todos = things.todos(start="Anytime", status="completed")
         self.assertEqual(8, len(todos))
@@ -235,6 +607,46 @@ class ThingsCase(unittest.TestCase):  # pylint: disable=R0904
         tasks = things.tasks(tag="Home", project="3x1QqJqfvZyhtw8NSdnZqG")
         self.assertEqual(1, len(tasks))
 
+    def test_tags_include_items(self):
+        tags = things.tags(include_items=True)
+        for tag in tags:
+            items = [*things.areas(tag=tag["title"]), *things.tasks(tag=tag["title"])]
+            self.assertEqual(items, tag["items"])
+        self.assertEqual(tags[0], things.tags(tags[0]["title"], include_items=True))
+
+    def test_tag_by_uuid(self):
+        database = things.Database()
+        self.assertEqual(
+            things.tasks(tag="Errand", database=database),
+            things.tasks(tag="H96sVJwE7VJveAnv7itmux", database=database),
+        )
+        tag = things.tags(title="H96sVJwE7VJveAnv7itmux", database=database)
+        self.assertEqual("Errand", tag["title"])  # type: ignore
+        self.assertEqual(1, len(things.tasks(tag=True, database=database)))
+        with self.assertRaises(ValueError):
+            things.areas(tag="Erand", database=database)
+
+        # The tags are only read once to validate tag arguments.
+        with unittest.mock.patch.object(
+            database, "fetch_all", wraps=database.fetch_all
+        ) as fetch_all:
+            things.tasks(tag="Home", database=database)
+            things.areas(tag="Home", database=database)
+        sql_queries = [call.args[0] for call in fetch_all.call_args_list]
+        self.assertFalse([sql for sql in sql_queries if "uuid, title FROM" in sql])
+
+    def test_tags_of_tasks(self):
+        database = things.Database()
+        task_uuids = [task["uuid"] for task in things.tasks(status=None)]
+        tags_of_tasks = database.get_tags_of_tasks(task_uuids)
+        self.assertEqual({"W5JYfjY2xtLdmedQKU6caM"}, set(tags_of_tasks))
+        for task_uuid in task_uuids:
+            self.assertEqual(
+                database.get_tags(task=task_uuid), tags_of_tasks.get(task_uuid, [])
+            )
+        task = things.tasks("W5JYfjY2xtLdmedQKU6caM")
+        self.assertEqual(["Errand", "Home"], task["tags"])  # type: ignore
+
     def test_get_link(self):
         link = things.link("uuid")
         self.assertEqual("things:///show?id=uuid", link)
@@ -279,6 +691,49 @@ class ThingsCase(unittest.TestCase):  # pylint: disable=R0904
         projects = things.projects(include_items=True)
         self.assertEqual(5, len(projects[0]["items"]))
 
+    def test_projects_include_items_query_count(self):
+        database = things.Database()
+        with unittest.mock.patch.object(
+            database, "execute_query", wraps=database.execute_query
+        ) as execute_query:
+            projects = things.projects(include_items=True, database=database)
+        # projects, their items, heading items, checklists, and tags
+        self.assertLessEqual(execute_query.call_count, 5)
+        headings = [
+            item
+            for project in projects
+            for item in project["items"]
+            if item["type"] == "heading"
+        ]
+        self.assertTrue(headings)
+        for heading in headings:
+            expected = things.tasks(
+                type="to-do", heading=heading["uuid"], context_trashed=None
+            )
+            self.assertEqual(
+                [task["uuid"] for task in expected],
+                [task["uuid"] for task in heading["items"]],
+            )
+
+    def test_include_items_chunked(self):
+        expected = things.tasks(include_items=True, status=None)
+        original = things.database.chunked
+
+        def chunked(iterable, size=None):  # pylint: disable=W0613
+            return original(iterable, 1)
+
+        # A task that is both top-level and nested lands in two chunks.
+        with unittest.mock.patch("things.api.chunked", chunked):
+            with unittest.mock.patch("things.database.chunked", chunked):
+                tasks = things.tasks(include_items=True, status=None)
+        self.assertEqual(expected, tasks)
+        todos = [task for task in tasks if task["type"] == "to-do"]
+        self.assertTrue(any(todo.get("checklist") for todo in todos))
+        self.assertTrue(any(todo.get("tags") for todo in todos))
+        for todo in todos:
+            tags = todo.get("tags") or []
+            self.assertEqual(sorted(set(tags)), sorted(tags))
+
     def test_areas(self):
         areas = things.areas()
         self.assertEqual(3, len(areas))
@@ -291,6 +746,75 @@ class ThingsCase(unittest.TestCase):  # pylint: disable=R0904
         area = things.areas("Y3JC4XeyGWxzDocQL4aobo")
         self.assertEqual("Area 3", area["title"])  # type: ignore
 
+    def test_areas_include_items(self):
+        database = things.Database()
+        with unittest.mock.patch.object(
+            database, "execute_query", wraps=database.execute_query
+        ) as execute_query:
+            areas = things.areas(include_items=True, database=database)
+        # areas, their tags, their tasks, items of projects and of headings, tags
+        self.assertEqual(6, execute_query.call_count)
+        for area in areas:
+            items = things.tasks(area=area["uuid"], include_items=True)
+            self.assertEqual(items, area["items"])
+
+    def test_database_registry(self):
+        registry = things.database.DatabaseRegistry(max_open=1)
+        database = registry.get()
+        self.assertIs(database, registry.get(TEST_DATABASE_FILEPATH))
+        tasks = things.iter_tasks(database=database, batch_size=1)
+        next(tasks)
+        self.assertIsNot(database, registry.get(print_sql=True))
+        # the least recently used database is forgotten, but stays open
+        # while in use, and is closed once it is not used anymore
+        self.assertEqual(len(things.tasks()) - 1, len(list(tasks)))
+        connection = database.connection
+        del database, tasks
+        with self.assertRaises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
+        database = registry.get()
+        registry.clear()
+        self.assertIsNot(database, registry.get())
+        registry.clear()
+
+    def test_database_result_cache(self):
+        with copy_test_database() as filepath:
+            database = things.Database(filepath=filepath, cache_size=8)
+            with unittest.mock.patch.object(
+                database, "fetch_all", wraps=database.fetch_all
+            ) as fetch_all:
+                tag = things.tags("Errand", database=database)
+                tag["title"] = "modified"  # type: ignore
+                tag = things.tags("Errand", database=database)
+                self.assertEqual("Errand", tag["title"])  # type: ignore
+                self.assertEqual(2, fetch_all.call_count)
+
+                write_database(
+                    filepath, "UPDATE TMTag SET shortcut = 'e' WHERE title = 'Errand'"
+                )
+                tag = things.tags("Errand", database=database)
+                self.assertEqual("e", tag["shortcut"])  # type: ignore
+                self.assertEqual(4, fetch_all.call_count)
+            database.close()
+
+    def test_database_snapshot(self):
+        with copy_test_database() as filepath:
+            database = things.Database(filepath=filepath, snapshot=True)
+            self.assertEqual(things.todos(), things.todos(database=database))
+            self.assertFalse(database.refresh())
+
+            write_database(
+                filepath, "UPDATE TMTag SET shortcut = 'e' WHERE title = 'Errand'"
+            )
+            tag = things.tags("Errand", database=database)
+            self.assertNotEqual("e", tag["shortcut"])  # type: ignore
+
+            self.assertTrue(database.refresh())
+            self.assertFalse(database.refresh())
+            tag = things.tags("Errand", database=database)
+            self.assertEqual("e", tag["shortcut"])  # type: ignore
+            database.close()
+
     def test_database_version(self):
         version = things.Database().get_version()
         self.assertEqual(24, version)
@@ -352,6 +876,147 @@ class ThingsCase(unittest.TestCase):  # pylint: disable=R0904
         with self.assertRaises((sqlite3.ProgrammingError, ValueError)):
             things.tasks(area="\0")
 
+    def test_iter_tasks(self):
+        for kwargs in ({}, {"status": "completed"}, {"include_items": True}):
+            tasks = things.tasks(**kwargs)
+            iterator = things.iter_tasks(batch_size=3, **kwargs)
+            self.assertEqual(tasks, list(iterator))
+
+        database = things.Database()
+        batches = database.get_tasks(status=None, batch_size=4)
+        self.assertTrue(all(len(batch) <= 4 for batch in batches))
+
+        with self.assertRaises(ValueError):
+            things.iter_tasks(status="invalid")
+
+    def test_row_type_record(self):
+        def as_dicts(value):
+            if isinstance(value, list):
+                return [as_dicts(item) for item in value]
+            if isinstance(value, things.database.Record):
+                return {key: as_dicts(item) for key, item in value._asdict().items()}
+            return value
+
+        for function in (things.tasks, things.areas, things.tags):
+            records = function(include_items=True, row_type="record")
+            self.assertEqual(function(include_items=True), as_dicts(records))
+
+        task = things.tasks("3Eva4XFof6zWb9iSfYy4ej", row_type="record")
+        self.assertIsInstance(task, things.database.Record)
+        self.assertEqual("to-do", task.type)
+        self.assertEqual("to-do", task["type"])
+        self.assertEqual(3, len(task.checklist))
+        self.assertIsNone(task.area)
+        self.assertIsNone(task.get("area"))
+        with self.assertRaises(KeyError):
+            task["area"]  # pylint: disable=W0104
+        with self.assertRaises(AttributeError):
+            task.title = "Title"  # type: ignore
+
+        task = things.Database().get_tasks(uuids=[task.uuid], row_type="record")[0]
+        self.assertIs(True, task.checklist)
+
+        with self.assertRaises(ValueError):
+            things.tasks(row_type="invalid")
+
+    def test_tasks_fields(self):
+        fields = ["title", "status"]
+        tasks = things.tasks(fields=fields, status=None)
+        expected = [
+            {key: task[key] for key in ("uuid", *fields)}
+            for task in things.tasks(status=None)
+        ]
+        self.assertEqual(expected, tasks)
+
+        task = things.tasks("3Eva4XFof6zWb9iSfYy4ej", fields="title")
+        self.assertEqual(["uuid", "type", "title", "checklist"], list(task))
+        self.assertEqual(3, len(task["checklist"]))
+        records = things.todos(fields=["deadline"], deadline=True, row_type="record")
+        self.assertEqual(["uuid", "deadline"], list(records[0]._asdict()))
+
+        sql_query = things.database.make_tasks_sql_query(fields=["title"])
+        self.assertNotIn("JOIN", sql_query)
+        self.assertNotIn("notes", sql_query)
+
+        with self.assertRaises(ValueError):
+            things.tasks(fields=["titel"])
+
+    def test_tasks_pages(self):
+        def read_pages(function, **kwargs):
+            pages = []
+            after = None
+            while True:
+                page = function(limit=4, after=after, **kwargs)
+                if not page:
+                    return pages
+                pages.extend(page)
+                # Fail instead of paging forever if a page repeats.
+                self.assertLessEqual(len(pages), len(function(**kwargs)))
+                after = things.cursor(page[-1])
+
+        orders = (
+            None,
+            "index",
+            "title",
+            "-deadline",
+            ["stop_date", "-created"],
+            "-index",
+        )
+        for order_by in orders:
+            kwargs = {"order_by": order_by, "status": None, "trashed": None}
+            pages = read_pages(things.tasks, **kwargs)
+            uuids = {task["uuid"] for task in things.tasks(**kwargs)}
+            self.assertEqual(len(uuids), len(pages))
+            self.assertEqual(uuids, {task["uuid"] for task in pages})
+            if order_by:
+                self.assertEqual(things.tasks(**kwargs), pages)
+        self.assertEqual(things.today(), read_pages(things.today))
+
+        # The cursor does not depend on the task after it was taken.
+        with copy_test_database() as filepath:
+            database = things.Database(filepath=filepath)
+            kwargs = {"order_by": "title", "status": None, "database": database}
+            tasks = things.tasks(**kwargs)
+            after = things.cursor(tasks[9], database=database)
+            write_database(
+                filepath, "DELETE FROM TMTask WHERE uuid = ?", (tasks[9]["uuid"],)
+            )
+            self.assertEqual(tasks[10:], things.tasks(after=after, **kwargs))
+            after = things.cursor(tasks[19], database=database)
+            write_database(
+                filepath,
+                "UPDATE TMTask SET title = 'A' WHERE uuid = ?",
+                (tasks[19]["uuid"],),
+            )
+            self.assertEqual(tasks[20:], things.tasks(after=after, **kwargs))
+            database.close()
+
+        with self.assertRaises(ValueError):
+            things.cursor("invalid")
+        with self.assertRaises(ValueError):
+            things.tasks(after="invalid")
+        with self.assertRaises(ValueError):
+            things.tasks(order_by=5)
+
+        tasks = things.tasks(order_by=["-deadline", "title"], deadline=True)
+        keys = [(task["deadline"], task["title"]) for task in tasks]
+        expected = sorted(sorted(keys), key=lambda key: key[0], reverse=True)
+        self.assertEqual(expected, keys)
+
+    def test_tasks_sql_parameters(self):
+        database = things.Database(cached_statements=16)
+        with unittest.mock.patch.object(
+            database, "execute_query", wraps=database.execute_query
+        ) as execute_query:
+            things.tasks(area="Area A", deadline="2021-03-28", database=database)
+            things.tasks(area="Area B", deadline="2022-01-01", database=database)
+        (sql_a, parameters_a), (sql_b, parameters_b) = (
+            call.args for call in execute_query.call_args_list
+        )
+        self.assertEqual(sql_a, sql_b)
+        self.assertEqual(("Area A", 132464128), parameters_a)
+        self.assertEqual(("Area B", 132518016), parameters_b)
+
     def test_tasks_stopdate_timezones(self):
         # see https://github.com/thingsapi/things.py/issues/117
         # this test looks at changes to two tasks based on timezone, on either side of midnight UTC
@@ -407,17 +1072,38 @@ class ThingsCase(unittest.TestCase):  # pylint: disable=R0904
         )
 
     def test_thingsdate(self):
-        sqlfilter: str = things.database.make_thingsdate_filter(
-            "deadline", "2021-03-28"
-        )
-        self.assertEqual("AND deadline == 132464128", sqlfilter)
+        sqlfilter = things.database.make_thingsdate_filter("deadline", "2021-03-28")
+        self.assertEqual(("AND deadline == ?", (132464128,)), sqlfilter)
         sqlfilter = things.database.make_unixtime_filter("stopDate", "future")
+        tomorrow = datetime.date.today() + datetime.timedelta(days=1)
         self.assertEqual(
-            "AND date(stopDate, 'unixepoch', 'localtime') > date('now', 'localtime')",
+            ("AND stopDate >= ?", (time.mktime(tomorrow.timetuple()),)),
             sqlfilter,
         )
         sqlfilter = things.database.make_unixtime_filter("stopDate", False)
-        self.assertEqual("AND stopDate IS NULL", sqlfilter)
+        self.assertEqual(("AND stopDate IS NULL", ()), sqlfilter)
+
+    def test_stopdate_filter_uses_index(self):
+        where_predicate, parameters = things.database.join_filters(
+            "TRUE",
+            things.database.make_unixtime_filter("TASK.stopDate", "<=2021-03-28"),
+        )
+        sql_query = things.database.make_tasks_sql_query(where_predicate)
+        plan = things.Database().execute_query(
+            f"EXPLAIN QUERY PLAN {sql_query}", parameters
+        )
+        self.assertTrue(any("index_TMTask_stopDate" in row["detail"] for row in plan))
+
+    def test_tasks_sql_query_one_row_per_task(self):
+        sql_query = things.database.make_tasks_sql_query()
+        self.assertNotIn("DISTINCT", sql_query)
+        plan = things.Database().execute_query(f"EXPLAIN QUERY PLAN {sql_query}")
+        self.assertFalse(any("DISTINCT" in row["detail"] for row in plan))
+
+        for tag in (None, "Errand", "Important"):
+            tasks = things.tasks(tag=tag, status=None, trashed=None)
+            uuids = [task["uuid"] for task in tasks]
+            self.assertEqual(len(set(uuids)), len(uuids))
 
     def test_thingstime(self):
         test_task = things.tasks("7F4vqUNiTvGKaCUfv5pqYG")
@@ -13,12 +13,16 @@ from things.api import (  # noqa  isort:skip
     anytime,
     areas,
     canceled,
+    changes,
     checklist_items,
     complete,
     completed,
+    cursor,
     deadlines,
     get,
+    get_many,
     inbox,
+    iter_tasks,
     last,
     link,
     logbook,
@@ -34,6 +38,7 @@ from things.api import (  # noqa  isort:skip
     trash,
     upcoming,
     url,
+    watch,
 )
 
 from things.database import Database  # noqa
@@ -0,0 +1,194 @@
+"""
+Asyncio version of the Things API.
+
+The functions of this module are awaitable versions of those of
+`things.api`, e.g., `await things.aio.today()`. They take the same
+parameters. A `database` has to be created with `thread_safe=True`.
+
+The blocking SQLite queries run on a dedicated pool of at most
+`MAX_WORKERS` threads, so they do not block the event loop. Each thread
+keeps its own open databases, see `things.database.DatabaseRegistry`.
+
+Concurrent calls with the same arguments share a single execution
+(single-flight). If the execution is shared, every caller gets its own
+copy of the result.
+
+Cancelling a call cancels the execution once no other caller waits for
+it. A running query is then interrupted, see
+`sqlite3.Connection.interrupt`.
+"""
+
+import asyncio
+import concurrent.futures
+import copy
+import threading
+from typing import Any, Dict, Optional
+
+from things import api
+from things.database import DATABASE_REGISTRY
+
+
+# Number of threads running queries.
+MAX_WORKERS = 4
+
+_EXECUTOR: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+# Executions in progress, keyed by event loop, function, and arguments.
+_FLIGHTS: Dict[Any, "Flight"] = {}
+
+
+class Flight:  # pylint: disable=R0902
+    """
+    Execution of an API function, shared by all callers waiting for it.
+
+    Parameters
+    ----------
+    function : callable
+        Function of `things.api` to run.
+
+    args : tuple
+        Positional arguments of `function`.
+
+    kwargs : dict
+        Keyword arguments of `function`.
+    """
+
+    def __init__(self, function, args, kwargs):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.future: Optional[asyncio.Future] = None
+        # Callers that ever joined, and those still waiting.
+        self.callers = 0
+        self.waiters = 0
+        self.cancelled = False
+        # Connection the execution currently uses, to interrupt it.
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def run(self):
+        """Run the function in the current thread."""
+        kwargs = dict(self.kwargs)
+        database = kwargs.pop("database", None) or DATABASE_REGISTRY.get(
+            filepath=kwargs.pop("filepath", None),
+            print_sql=kwargs.pop("print_sql", False),
+        )
+        with self._lock:
+            if self.cancelled:
+                return None
+            self._connection = database.connection
+        try:
+            return self.function(*self.args, database=database, **kwargs)
+        finally:
+            with self._lock:
+                self._connection = None
+
+    def cancel(self):
+        """Cancel the execution and interrupt its query, if any."""
+        with self._lock:
+            self.cancelled = True
+            if self._connection is not None:
+                self._connection.interrupt()
+        if self.future is not None:
+            self.future.cancel()
+
+
+async def run(function, *args, **kwargs):
+    """
+    Run `function` on the executor and return its result.
+
+    Calls of the same function with the same arguments that overlap in
+    time share one execution. Each of them then gets a deep copy of its
+    result, so that modifying a result is safe. A caller that did not
+    share the execution gets the result itself.
+    """
+    database = kwargs.get("database")
+    if database is not None and not database.thread_safe:
+        raise ValueError("Pass a database created with `thread_safe=True`")
+
+    loop = asyncio.get_running_loop()
+    key = (loop, function, repr(args), repr(sorted(kwargs.items())))
+    flight = _FLIGHTS.get(key)
+    if flight is None:
+        flight = _FLIGHTS[key] = Flight(function, args, kwargs)
+        flight.future = loop.run_in_executor(get_executor(), flight.run)
+        flight.future.add_done_callback(lambda _future: remove_flight(key, flight))
+
+    flight.callers += 1
+    flight.waiters += 1
+    try:
+        result = await asyncio.shield(flight.future)
+    finally:
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.future.done():
+            # Nobody waits for the result anymore.
+            remove_flight(key, flight)
+            flight.cancel()
+
+    # Nobody joins a flight once it is done, so `callers` is final here.
+    if flight.callers > 1:
+        return copy.deepcopy(result)
+    return result
+
+
+def get_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """Return the executor running the queries, creating it if needed."""
+    global _EXECUTOR  # pylint: disable=W0603
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+                max_workers=MAX_WORKERS, thread_name_prefix="things.aio"
+            )
+        return _EXECUTOR
+
+
+def make_async(function):
+    """Return an awaitable version of a function of `things.api`."""
+
+    async def wrapper(*args, **kwargs):
+        return await run(function, *args, **kwargs)
+
+    wrapper.__name__ = wrapper.__qualname__ = function.__name__
+    wrapper.__doc__ = f"Awaitable version of `things.api.{function.__name__}`."
+    return wrapper
+
+
+def remove_flight(key, flight):
+    """Stop sharing `flight` with new callers."""
+    if _FLIGHTS.get(key) is flight:
+        del _FLIGHTS[key]
+
+
+def shutdown():
+    """Shut down the executor. It is created again when needed."""
+    global _EXECUTOR  # pylint: disable=W0603
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is not None:
+            _EXECUTOR.shutdown()
+            _EXECUTOR = None
+
+
+anytime = make_async(api.anytime)
+areas = make_async(api.areas)
+canceled = make_async(api.canceled)
+changes = make_async(api.changes)
+checklist_items = make_async(api.checklist_items)
+completed = make_async(api.completed)
+cursor = make_async(api.cursor)
+deadlines = make_async(api.deadlines)
+get = make_async(api.get)
+get_many = make_async(api.get_many)
+inbox = make_async(api.inbox)
+last = make_async(api.last)
+logbook = make_async(api.logbook)
+projects = make_async(api.projects)
+search = make_async(api.search)
+someday = make_async(api.someday)
+tags = make_async(api.tags)
+tasks = make_async(api.tasks)
+today = make_async(api.today)
+todos = make_async(api.todos)
+token = make_async(api.token)
+trash = make_async(api.trash)
+upcoming = make_async(api.upcoming)
@@ -7,12 +7,24 @@ that occur in the Things SQL database to closer reflect its underlying
 data structures. Whenever that happens, we define the new term here.
 """
 
+# pylint: disable=C0302
+
 import os  # pylint: disable=C0412
 import urllib.parse
 from shlex import quote
 from typing import Dict, List, Union
 
-from things.database import Database
+from things.database import (
+    DATABASE_REGISTRY,
+    DEFAULT_BATCH_SIZE,
+    MAX_PARAMETERS_PER_QUERY,
+    chunked,
+    copy_row,
+    validate_limit,
+)
+from things.changes import get_changes
+from things.fts import SearchIndex
+from things.watcher import Watcher
 
 
 # --------------------------------------------------
@@ -20,7 +32,7 @@ from things.database import Database
 # --------------------------------------------------
 
 
-def tasks(uuid=None, include_items=False, **kwargs):  # noqa: C901
+def tasks(uuid=None, include_items=False, **kwargs):
     """
     Read tasks into dicts.
 
@@ -52,7 +64,8 @@ def tasks(uuid=None, include_items=False, **kwargs):  # noqa: C901
         default 'incomplete'
 
         Only include tasks matching that status. If `status == None`,
-        then include tasks with any status value.
+        then include tasks with any status value. A list of statuses
+        includes tasks matching any of them.
 
     start : {'Inbox', 'Anytime', 'Someday', None}, optional
         Only include tasks matching that start value. If the argument is
@@ -80,7 +93,7 @@ def tasks(uuid=None, include_items=False, **kwargs):  # noqa: C901
         - `heading == None` (default), then include all tasks.
 
     tag : str or bool or None, optional
-        Any valid title of a tag. Only include tasks matching that tag.
+        Any valid title or uuid of a tag. Only include tasks matching that tag.
         Special cases:
         - `tag == False`, only include tasks _without_ tags.
         - `tag == True`, only include tasks _with_ tags.
@@ -147,9 +160,48 @@ def tasks(uuid=None, include_items=False, **kwargs):  # noqa: C901
     index : {'index', 'todayIndex'}, default 'index'
         Database field to order result by.
 
+    order_by : str or list of str, optional
+        Field(s) to order result by instead of `index`, any of 'created',
+        'deadline', 'index', 'modified', 'start_date', 'stop_date',
+        'title', and 'today_index'. Prefix a field with '-' for
+        descending order, e.g., `['-stop_date', 'title']`. The ordering
+        is done by SQLite.
+
+    limit : int, optional
+        Only return the first `limit` tasks.
+
+    after : str, optional
+        Cursor of a task, see `things.api.cursor`. Only return the tasks
+        that come after that task in the requested order. Together with
+        `limit`, this pages through the result: pass the cursor of the
+        last task of the previous page. Unlike an offset, this neither
+        skips nor repeats tasks when tasks are added, changed, or
+        removed in between.
+
+    fields : str or list of str, optional
+        Only return these fields of each task, e.g., `['title', 'status']`.
+        The query then skips the columns and joins that are not needed,
+        such as the notes and the decoding of dates. `uuid` is always
+        returned, and so are `type` and `checklist` if `include_items`
+        is set, as they are needed to look up the items.
+
     count_only : bool, default False
         Only output length of result. This is done by a SQL COUNT query.
 
+    uuids : list of str, optional
+        Only include tasks with any of these uuids.
+
+    today : bool, default False
+        Only include tasks shown in Today, see `things.api.today`.
+        The tasks are then ordered as in Today and `index` is ignored.
+
+    row_type : {'dict', 'record'}, default 'dict'
+        - `'dict'` (default): return tasks as dicts.
+        - `'record'`: return tasks as immutable, compact named tuples
+          (see `things.database.Record`), which need a fraction of the
+          memory of dicts. Fields are accessed as `task.title` or
+          `task['title']`, and `task._asdict()` returns the dict.
+
     print_sql : bool, default False
         Print every SQL query performed. Some may contain '?' and ':'
         characters, which correspond to SQLite parameter tokens.
@@ -187,6 +239,8 @@ def tasks(uuid=None, include_items=False, **kwargs):  # noqa: C901
 
     """
     database = pop_database(kwargs)
+    if uuid or include_items:
+        kwargs["fields"] = add_item_fields(kwargs.get("fields"))
     result = database.get_tasks(
         uuid=uuid, status=kwargs.pop("status", "incomplete"), **kwargs
     )
@@ -198,40 +252,8 @@ def tasks(uuid=None, include_items=False, **kwargs):  # noqa: C901
     if uuid:
         include_items = True
 
-    for task in result:
-        # TK: How costly of an operation is it to do this for every task?
-        # IF costly, then can it be made significantly more efficient
-        # by optimizing SQL calls?
-
-        if task.get("tags"):
-            task["tags"] = database.get_tags(task=task["uuid"])
-
-        if not include_items:
-            continue
-
-        # include items
-        if task["type"] == "to-do":
-            if task.get("checklist"):
-                task["checklist"] = database.get_checklist_items(task["uuid"])
-        elif task["type"] == "project":
-            project = task
-            project["items"] = items = tasks(
-                project=project["uuid"],
-                context_trashed=None,
-                include_items=True,
-                database=database,
-            )
-            # to-dos without headings appear before headings in app
-            items.sort(key=lambda item: item["type"], reverse=True)
-        elif task["type"] == "heading":
-            heading = task
-            heading["items"] = tasks(
-                type="to-do",
-                heading=heading["uuid"],
-                context_trashed=None,
-                include_items=True,
-                database=database,
-            )
+    row_type = kwargs.get("row_type", "dict")
+    result = include_items_and_tags(result, include_items, database, row_type)
 
     if uuid:
         result = result[0]
@@ -239,6 +261,75 @@ def tasks(uuid=None, include_items=False, **kwargs):  # noqa: C901
     return result
 
 
+def iter_tasks(include_items=False, batch_size=DEFAULT_BATCH_SIZE, **kwargs):
+    """
+    Read tasks into dicts, one at a time.
+
+    Like `things.api.tasks`, but rows are fetched from the database in
+    batches while iterating. Tags and items are filled in per batch, so
+    memory use is bounded by `batch_size` instead of the number of
+    matching tasks. Use this to export large result sets such as the
+    whole Logbook.
+
+    Parameters
+    ----------
+    include_items : bool, default False
+        Include items contained within a task. These might include
+        checklist items, headings, and to-dos.
+
+    batch_size : int, default 500
+        Number of tasks fetched and processed at a time.
+
+    **kwargs
+        See `things.api.tasks` for details on the optional parameters,
+        except for `uuid` and `count_only`.
+
+    Returns
+    -------
+    iterator of dict
+        Representing multiple tasks.
+
+    Examples
+    --------
+    >>> for task in things.iter_tasks(status='completed'):
+    ...     print(task['title'])  # doctest: +SKIP
+    >>> next(things.iter_tasks())
+    {'uuid': '6Hf2qWBjWhq7B1xszwdo34', 'type': 'to-do', 'title':...
+    """
+    database = pop_database(kwargs)
+    if include_items:
+        kwargs["fields"] = add_item_fields(kwargs.get("fields"))
+    # Not a generator itself, so that invalid arguments raise right away.
+    batches = database.get_tasks(
+        status=kwargs.pop("status", "incomplete"), batch_size=batch_size, **kwargs
+    )
+    row_type = kwargs.get("row_type", "dict")
+    return iter_included_items(batches, include_items, database, row_type)
+
+
+def cursor(task, **kwargs) -> str:
+    """
+    Return a cursor to read the tasks that come after a task.
+
+    Pass the cursor as `after` to `things.api.tasks` or any of the views
+    based on it, such as `things.api.logbook`, to read the next page.
+    The cursor holds the values the task is ordered by at the time of
+    this call, so it stays valid even if the task changes or is deleted.
+
+    Parameters
+    ----------
+    task : dict, things.database.Record, or str
+        A task, e.g., the last one of a page, or its uuid.
+
+    Examples
+    --------
+    >>> page = things.tasks(order_by='title', limit=5)
+    >>> next_page = things.tasks(order_by='title', limit=5, after=things.cursor(page[-1]))
+    """
+    database = pop_database(kwargs)
+    return database.get_cursor(task if isinstance(task, str) else task["uuid"])
+
+
 def areas(uuid=None, include_items=False, **kwargs):
     """
     Read areas into dicts.
@@ -252,7 +343,7 @@ def areas(uuid=None, include_items=False, **kwargs):
         Include tasks and projects in each area.
 
     tag : str or bool or None, optional
-        Any valid title of a tag. Only include areas matching that tag.
+        Any valid title or uuid of a tag. Only include areas matching that tag.
         Special cases:
         - `tag == False`, only include areas _without_ tags.
         - `tag == True`, only include areas _with_ tags.
@@ -262,6 +353,9 @@ def areas(uuid=None, include_items=False, **kwargs):
     count_only : bool, default False
         Only output length of result. This is done by a SQL COUNT query.
 
+    row_type : {'dict', 'record'}, default 'dict'
+        Return areas as dicts or as records. See `things.api.tasks`.
+
     filepath : str, optional
         Any valid path of a SQLite database file generated by the Things app.
         If no path is provided, then access the default database path.
@@ -295,13 +389,8 @@ def areas(uuid=None, include_items=False, **kwargs):
     if kwargs.get("count_only"):
         return result
 
-    for area in result:
-        if area.get("tags"):
-            area["tags"] = database.get_tags(area=area["uuid"])
-        if include_items:
-            area["items"] = tasks(
-                area=area["uuid"], include_items=True, database=database
-            )
+    row_type = kwargs.get("row_type", "dict")
+    result = include_items_of_areas(result, include_items, database, row_type)
 
     if uuid:
         result = result[0]
@@ -316,7 +405,7 @@ def tags(title=None, include_items=False, **kwargs):
     Parameters
     ----------
     title : str, optional
-        Any valid title of a tag. Include all items of said tag.
+        Any valid title or uuid of a tag. Include all items of said tag.
         If None, then return all tags.
 
     include_items : bool, default False
@@ -332,6 +421,9 @@ def tags(title=None, include_items=False, **kwargs):
     titles_only : bool, default False
         If True, only return list of titles of tags.
 
+    row_type : {'dict', 'record'}, default 'dict'
+        Return tags as dicts or as records. See `things.api.tasks`.
+
     filepath : str, optional
         Any valid path of a SQLite database file generated by the Things app.
         If no path is provided, then access the default database path.
@@ -363,12 +455,8 @@ def tags(title=None, include_items=False, **kwargs):
     result = database.get_tags(title=title, **kwargs)
 
     if include_items:
-        for tag in result:
-            tag_title = tag["title"]
-            tag["items"] = [
-                *areas(tag=tag_title, database=database),
-                *tasks(tag=tag_title, database=database),
-            ]
+        row_type = kwargs.get("row_type", "dict")
+        result = include_items_of_tags(result, database, row_type)
 
     if title:
         result = result[0]
@@ -388,13 +476,17 @@ def checklist_items(todo_uuid, **kwargs):
     todo_uuid : str, optional
         A valid to-do uuid.
 
+    row_type : {'dict', 'record'}, default 'dict'
+        Return checklist items as dicts or as records.
+        See `things.api.tasks`.
+
     Returns
     -------
     list of dict
         Checklist items.
     """
     database = pop_database(kwargs)
-    return database.get_checklist_items(todo_uuid=todo_uuid)
+    return database.get_checklist_items(todo_uuid=todo_uuid, **kwargs)
 
 
 # --------------------------------------------------
@@ -411,6 +503,14 @@ def search(query: str, **kwargs) -> List[Dict]:
 
     See the `search_query` parameter of `things.api.tasks` for details.
 
+    If a full-text search index has been built for the database with
+    `things.fts.SearchIndex.find(database, create=True)`, then the index
+    is used instead. In that case, every word of the query is matched
+    as the beginning of a word in titles, notes, checklist items, tags,
+    and the titles of areas, projects, and headings. Results are ordered
+    by relevance, so `order_by` and `after` can not be used, and `limit`
+    applies to the results in that order.
+
     Examples
     --------
     >>> things.search('Today%yellow')
@@ -421,7 +521,124 @@ def search(query: str, **kwargs) -> List[Dict]:
       'notes': '',
       ...
     """
-    return tasks(search_query=query, **kwargs)
+    database = pop_database(kwargs)
+    index = SearchIndex.find(database)
+    if index is None:
+        return tasks(search_query=query, database=database, **kwargs)
+
+    for parameter in ("order_by", "after"):
+        if kwargs.get(parameter) is not None:
+            raise ValueError(
+                f"Invalid {parameter} argument: {kwargs[parameter]!r}\n"
+                "Results of the search index are ordered by relevance."
+            )
+    limit = kwargs.pop("limit", None)
+    validate_limit("limit", limit)
+
+    index.sync(database)
+    return search_index(index.search(query), limit, database, **kwargs)
+
+
+def changes(since=None, **kwargs):
+    """
+    Read the tasks, checklist items, and areas changed since a watermark.
+
+    Each call returns a new watermark. Pass it to the next call to only
+    get what changed in between, e.g., to keep a copy of the database
+    in sync without reading all tasks every time. Tasks are read based
+    on their modification dates and those of their checklist items,
+    projects, and headings, and renamed areas and tags; objects may be
+    returned again although they did not change.
+
+    Parameters
+    ----------
+    since : str, optional
+        Watermark returned by a previous call. If None, return all
+        tasks, checklist items, and areas.
+
+    filepath : str, optional
+        Any valid path of a SQLite database file generated by the Things app.
+        If no path is provided, then access the default database path.
+
+    database : things.database.Database, optional
+        Any valid `things.database.Database` object previously instantiated.
+
+    Returns
+    -------
+    dict
+        - `'tasks'`: tasks that were added or changed, like returned by
+          `things.api.get`, but without their items. Includes trashed
+          and recurring tasks.
+        - `'checklist_items'`: checklist items that were added or
+          changed, with the uuid of their to-do as `'task'`.
+        - `'areas'`: areas that were added or changed.
+        - `'deleted'`: uuids of deleted objects.
+        - `'watermark'`: an opaque str to pass as `since` next time.
+
+    Examples
+    --------
+    >>> result = things.changes()
+    >>> len(result['tasks'])
+    50
+    >>> things.changes(since=result['watermark'])['tasks']
+    [{'uuid': '...', ...
+    """
+    database = pop_database(kwargs)
+    result = get_changes(database, since)
+    result["tasks"] = include_items_and_tags(result["tasks"], False, database)
+    result["areas"] = include_items_of_areas(result["areas"], False, database)
+    return result
+
+
+def watch(callback=None, interval=1.0, debounce=0.5, **kwargs):
+    """
+    Watch the database and get notified when the Things app changed it.
+
+    Use this instead of reading, e.g., `things.today()` on a timer: the
+    database is only queried again after its data actually changed.
+
+    Parameters
+    ----------
+    callback : callable, optional
+        Called from a background thread with a `things.watcher.ChangeEvent`
+        for every change. If None, iterate asynchronously over the
+        returned watcher to get the events.
+
+    interval : float, default 1.0
+        Seconds between checks of the database files.
+
+    debounce : float, default 0.5
+        Seconds without further changes before an event is emitted, so
+        that a burst of writes results in a single event.
+
+    filepath : str, optional
+        Any valid path of a SQLite database file generated by the Things app.
+        If no path is provided, then access the default database path.
+
+    database : things.database.Database, optional
+        Watch the database file of this database object.
+
+    Returns
+    -------
+    things.watcher.Watcher
+        Call `stop()` on it, or use it as a context manager, to stop
+        watching.
+
+    Examples
+    --------
+    >>> watcher = things.watch(lambda event: print(things.today()))
+    >>> watcher.stop()
+    >>> async def print_today():
+    ...     async for event in things.watch():
+    ...         print(things.today())
+    """
+    database = kwargs.get("database")
+    filepath = database.filepath if database else kwargs.get("filepath")
+    watcher = Watcher(filepath, interval=interval, debounce=debounce)
+    if callback is not None:
+        watcher.subscribe(callback)
+        watcher.start()
+    return watcher
 
 
 def get(uuid, default=None, **kwargs):
@@ -430,23 +647,76 @@ def get(uuid, default=None, **kwargs):
 
     Currently supports tasks, projects, headings, areas, and tags.
     """
-    try:
-        return tasks(uuid=uuid, **kwargs)
-    except ValueError:
-        pass
-
-    try:
-        return areas(uuid=uuid, **kwargs)
-    except ValueError:
-        pass
+    database = pop_database(kwargs)
+    type_of_uuid = database.get_types_of_uuids([uuid]).get(uuid)
 
-    for tag in tags(**kwargs):
-        if tag["uuid"] == uuid:
-            return tag
+    if type_of_uuid == "task":
+        return tasks(uuid=uuid, database=database, **kwargs)
+    if type_of_uuid == "area":
+        return areas(uuid=uuid, database=database, **kwargs)
+    if type_of_uuid == "tag":
+        return tags(title=uuid, database=database, **kwargs)
 
     return default
 
 
+def get_many(uuids, **kwargs):
+    """
+    Find objects by uuid, like `things.api.get`, but in bulk.
+
+    The objects are read with a few chunked queries per type of object
+    rather than several queries per uuid.
+
+    Parameters
+    ----------
+    uuids : list of str
+        Uuids of tasks, projects, headings, areas, or tags.
+
+    row_type : {'dict', 'record'}, default 'dict'
+        Return objects as dicts or as records. See `things.api.tasks`.
+
+    filepath : str, optional
+        Any valid path of a SQLite database file generated by the Things app.
+        If no path is provided, then access the default database path.
+
+    database : things.database.Database, optional
+        Any valid `things.database.Database` object previously instantiated.
+
+    Returns
+    -------
+    dict
+        Mapping the uuids found to their objects, in the order of `uuids`.
+        Uuids that are not found are left out.
+
+    Examples
+    --------
+    >>> things.get_many(['DciSFacytdrNG1nRaMJPgY', 'CK9dARrf2ezbFvrVUUxkHE'])
+    {'DciSFacytdrNG1nRaMJPgY': {'uuid': 'DciSFacytdrNG1nRaMJPgY', 'type': 'area', ...
+    """
+    database = pop_database(kwargs)
+    row_type = kwargs.get("row_type", "dict")
+    types_of_uuids = database.get_types_of_uuids(uuids)
+    uuids_of_type: Dict[str, List[str]] = {"task": [], "area": [], "tag": []}
+    for uuid, type_of_uuid in types_of_uuids.items():
+        uuids_of_type[type_of_uuid].append(uuid)
+
+    # Tasks are returned with their items, as by `things.api.tasks(uuid)`.
+    objects = database.get_tasks_by_uuids(uuids_of_type["task"], row_type=row_type)
+    objects = include_items_and_tags(objects, True, database, row_type)
+    for chunk in chunked(uuids_of_type["area"]):
+        area_rows = database.get_areas(uuid=chunk, row_type=row_type)
+        objects.extend(include_items_of_areas(area_rows, False, database, row_type))
+    if uuids_of_type["tag"]:
+        objects.extend(
+            tag
+            for tag in database.get_tags(row_type=row_type)
+            if tag["uuid"] in types_of_uuids
+        )
+
+    objects_of_uuids = {obj["uuid"]: obj for obj in objects}
+    return {uuid: objects_of_uuids[uuid] for uuid in uuids if uuid in objects_of_uuids}
+
+
 # Filter by object type
 
 
@@ -491,42 +761,12 @@ def today(**kwargs):
     tasks would show up in Today if you were to open the app right now.
     This prediction does not include repeating tasks at this time.
 
+    The tasks are selected and ordered in a single query, see the
+    `today` parameter of `things.api.tasks`.
+
     See `things.api.tasks` for details on the optional parameters.
     """
-    database = pop_database(kwargs)
-    kwargs["database"] = database
-
-    regular_today_tasks = tasks(
-        start_date=True,
-        start="Anytime",
-        index="todayIndex",
-        **kwargs,
-    )
-
-    # Predictions of new to-dos indicated by a yellow dot in the app.
-
-    unconfirmed_scheduled_tasks = tasks(
-        start_date="past",
-        start="Someday",
-        index="todayIndex",
-        **kwargs,
-    )
-
-    unconfirmed_overdue_tasks = tasks(
-        start_date=False,
-        deadline="past",
-        deadline_suppressed=False,
-        **kwargs,
-    )
-
-    result = [
-        *regular_today_tasks,
-        *unconfirmed_scheduled_tasks,
-        *unconfirmed_overdue_tasks,
-    ]
-    result.sort(key=lambda task: (task["today_index"], task["start_date"] or ""))
-
-    return result
+    return tasks(today=True, **kwargs)
 
 
 def upcoming(**kwargs):
@@ -559,15 +799,38 @@ def someday(**kwargs):
     return tasks(start_date=False, start="Someday", **kwargs)
 
 
-def logbook(**kwargs):
+def logbook(limit=None, after=None, **kwargs):
     """
     Read Logbook tasks into dicts.
 
-    See `things.api.tasks` for details on the optional parameters.
+    Completed and canceled tasks, most recently stopped first. They are
+    selected, ordered, and limited in a single query.
+
+    Parameters
+    ----------
+    limit : int, optional
+        Only return this many tasks.
+
+    after : str, optional
+        Cursor of the last task of the previous page, see
+        `things.api.cursor`. Only return the tasks that come after it.
+        Tasks stopped at the same time are ordered by their index and
+        uuid, so that no task is skipped between pages.
+
+    See `things.api.tasks` for details on the other optional parameters.
+
+    Examples
+    --------
+    >>> page = things.logbook(limit=10)
+    >>> next_page = things.logbook(limit=10, after=things.cursor(page[-1]))
     """
-    result = [*canceled(**kwargs), *completed(**kwargs)]
-    result.sort(key=lambda task: task["stop_date"], reverse=True)
-    return result
+    kwargs.setdefault("order_by", "-stop_date")
+    return tasks(
+        status=["canceled", "completed"],
+        limit=limit,
+        after=after,
+        **kwargs,
+    )
 
 
 def trash(**kwargs):
@@ -620,9 +883,8 @@ def deadlines(**kwargs):
 
     See `things.api.tasks` for details on the optional parameters.
     """
-    result = tasks(deadline=True, **kwargs)
-    result.sort(key=lambda task: task["deadline"])
-    return result
+    kwargs.setdefault("order_by", "deadline")
+    return tasks(deadline=True, **kwargs)
 
 
 def last(offset, **kwargs):
@@ -656,11 +918,8 @@ def last(offset, **kwargs):
     if offset is None:
         raise ValueError(f"Invalid offset type: {offset!r}")
 
-    result = tasks(last=offset, **kwargs)
-    if result:
-        result.sort(key=lambda task: task["created"], reverse=True)
-
-    return result
+    kwargs.setdefault("order_by", "-created")
+    return tasks(last=offset, **kwargs)
 
 
 # Interact with Things app
@@ -770,12 +1029,251 @@ def complete(uuid):  # noqa
 # Helper functions
 
 
+def include_items_and_tags(task_rows, include_items, database, row_type="dict"):
+    """
+    Fill in the tags of tasks and, optionally, their contained items.
+
+    Projects and headings get an `items` list, to-dos their `checklist`.
+    The subtree is loaded level by level with one (chunked) query per
+    level and container type, and all tags with a single (chunked)
+    query, rather than one query per task.
+
+    Return the tasks. Dicts are updated in place, records are replaced.
+    """
+    items_of_tasks = {}
+    checklists = {}
+    if include_items:
+        items_of_tasks = get_items_of_tasks(task_rows, database, row_type)
+        # A task may be both in `task_rows` and nested in one of them.
+        todo_uuids = list(
+            dict.fromkeys(
+                task["uuid"]
+                for task in iter_nested_tasks(task_rows, items_of_tasks)
+                if task["type"] == "to-do" and task.get("checklist")
+            )
+        )
+        if todo_uuids:
+            checklists = database.get_checklist_items_of_tasks(
+                todo_uuids, row_type=row_type
+            )
+
+    tagged_uuids = list(
+        dict.fromkeys(
+            task["uuid"]
+            for task in iter_nested_tasks(task_rows, items_of_tasks)
+            if task.get("tags")
+        )
+    )
+    tags_of_tasks = database.get_tags_of_tasks(tagged_uuids) if tagged_uuids else {}
+
+    def include(task):
+        replacements = {}
+        if task.get("tags"):
+            replacements["tags"] = tags_of_tasks.get(task["uuid"], [])
+        if include_items and task["type"] in ("project", "heading"):
+            items = items_of_tasks.get(task["uuid"], [])
+            replacements["items"] = [include(item) for item in items]
+        elif include_items and task["type"] == "to-do" and task.get("checklist"):
+            replacements["checklist"] = checklists.get(task["uuid"], [])
+        return replace_fields(task, replacements)
+
+    return [include(task) for task in task_rows]
+
+
+def add_item_fields(fields):
+    """Return `fields` with the fields needed to include items added."""
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        fields = [fields]
+    return [*fields, "type", "checklist"]
+
+
+def include_items_of_areas(area_rows, include_items, database, row_type="dict"):
+    """
+    Fill in the tags of areas and, optionally, their items.
+
+    The tags of all areas are read with a single (chunked) query, and
+    so are their items, rather than a few queries per area.
+    """
+    tagged_uuids = [area["uuid"] for area in area_rows if area.get("tags")]
+    tags_of_areas = database.get_tags_of_areas(tagged_uuids) if tagged_uuids else {}
+
+    items_of_areas: Dict[str, list] = {}
+    if include_items:
+        for chunk in chunked([area["uuid"] for area in area_rows]):
+            items = tasks(
+                area=chunk, include_items=True, database=database, row_type=row_type
+            )
+            for item in items:
+                items_of_areas.setdefault(item["area"], []).append(item)
+
+    def include(area):
+        replacements = {}
+        if area.get("tags"):
+            replacements["tags"] = tags_of_areas.get(area["uuid"], [])
+        if include_items:
+            replacements["items"] = items_of_areas.get(area["uuid"], [])
+        return replace_fields(area, replacements)
+
+    return [include(area) for area in area_rows]
+
+
+def include_items_of_tags(tag_rows, database, row_type="dict"):
+    """
+    Fill in the areas and tasks tagged with each tag of `tag_rows`.
+
+    Rather than querying the items of each tag, all tagged areas and
+    tasks are read and hydrated once, and then grouped by their tags.
+    """
+    if not tag_rows:
+        return tag_rows
+    tag = tag_rows[0]["title"] if len(tag_rows) == 1 else True
+    items = [
+        *areas(tag=tag, database=database, row_type=row_type),
+        *tasks(tag=tag, database=database, row_type=row_type),
+    ]
+    items_of_tags: Dict[str, list] = {}
+    for item in items:
+        for tag_title in item.get("tags") or ():
+            items_of_tags.setdefault(tag_title, []).append(copy_row(item))
+    return [
+        replace_fields(tag, {"items": items_of_tags.get(tag["title"], [])})
+        for tag in tag_rows
+    ]
+
+
+def get_items_of_tasks(task_rows, database, row_type="dict"):
+    """
+    Load the items of all projects and headings nested within `task_rows`.
+
+    Return a dict mapping uuids of projects and headings to their items.
+    """
+    items_of_tasks = {}
+    level = list(task_rows)
+    while level:
+        project_uuids = [task["uuid"] for task in level if task["type"] == "project"]
+        heading_uuids = [task["uuid"] for task in level if task["type"] == "heading"]
+        items_of_level = {
+            **get_items_of_projects(project_uuids, database, row_type),
+            **get_items_of_headings(heading_uuids, database, row_type),
+        }
+        items_of_tasks.update(items_of_level)
+        level = [item for items in items_of_level.values() for item in items]
+    return items_of_tasks
+
+
+def get_items_of_projects(project_uuids, database, row_type="dict"):
+    """Return a dict mapping project uuids to their items."""
+    items_of_projects = {}
+    # Each uuid is bound twice: to the project and to the project of a heading.
+    for chunk in chunked(project_uuids, MAX_PARAMETERS_PER_QUERY // 2):
+        items = database.get_tasks(
+            project=chunk, status="incomplete", context_trashed=None, row_type=row_type
+        )
+        # To-dos within headings are not directly assigned to a project.
+        projects_of_headings = {
+            item["uuid"]: item["project"] for item in items if item["type"] == "heading"
+        }
+        unknown_headings = {
+            item["heading"]
+            for item in items
+            if item.get("project") is None
+            and item["heading"] not in projects_of_headings
+        }
+        if unknown_headings:
+            projects_of_headings.update(
+                database.get_projects_of_headings(list(unknown_headings))
+            )
+        for item in items:
+            project_uuid = item.get("project") or projects_of_headings[item["heading"]]
+            items_of_projects.setdefault(project_uuid, []).append(item)
+
+    for items in items_of_projects.values():
+        # to-dos without headings appear before headings in app
+        items.sort(key=lambda item: item["type"], reverse=True)
+    return items_of_projects
+
+
+def get_items_of_headings(heading_uuids, database, row_type="dict"):
+    """Return a dict mapping heading uuids to their to-dos."""
+    items_of_headings = {}
+    for chunk in chunked(heading_uuids):
+        items = database.get_tasks(
+            type="to-do",
+            heading=chunk,
+            status="incomplete",
+            context_trashed=None,
+            row_type=row_type,
+        )
+        for item in items:
+            items_of_headings.setdefault(item["heading"], []).append(item)
+    return items_of_headings
+
+
+def iter_included_items(batches, include_items, database, row_type="dict"):
+    """Yield the tasks of `batches` after filling in their tags and items."""
+    for batch in batches:
+        yield from include_items_and_tags(batch, include_items, database, row_type)
+
+
+def iter_nested_tasks(task_rows, items_of_tasks):
+    """Yield `task_rows` and all items nested within them."""
+    for task in task_rows:
+        yield task
+        yield from iter_nested_tasks(
+            items_of_tasks.get(task["uuid"], ()), items_of_tasks
+        )
+
+
+def search_index(uuids, limit, database, **kwargs):
+    """
+    Read the tasks of `uuids`, found by the search index, in their order.
+
+    The uuids are read in chunks, best matches first, until `limit`
+    tasks pass the filters of `kwargs`.
+    """
+    if kwargs.get("count_only"):
+        count = sum(
+            tasks(uuids=chunk, database=database, **kwargs) for chunk in chunked(uuids)
+        )
+        return count if limit is None else min(count, limit)
+
+    ranks = {uuid: rank for rank, uuid in enumerate(uuids)}
+    result: List = []
+    for chunk in chunked(uuids):
+        if limit is not None and len(result) >= limit:
+            break
+        rows = tasks(uuids=chunk, database=database, **kwargs)
+        result += sorted(rows, key=lambda task: ranks[task["uuid"]])
+    return result[:limit]
+
+
+def replace_fields(row, replacements):
+    """
+    Return `row` with some of its fields replaced.
+
+    Dicts are updated in place, records are immutable and get copied.
+    """
+    if not replacements:
+        return row
+    if isinstance(row, dict):
+        row.update(replacements)
+        return row
+    return row._replace(**replacements)
+
+
 def pop_database(kwargs):
-    """Instantiate non-default database from `kwargs` if provided."""
+    """
+    Instantiate non-default database from `kwargs` if provided.
+
+    Without a `database` argument, an already open database is reused
+    from `things.database.DATABASE_REGISTRY` where possible.
+    """
     filepath = kwargs.pop("filepath", None)
     database = kwargs.pop("database", None)
     print_sql = kwargs.pop("print_sql", False)
 
     if not database:
-        database = Database(filepath=filepath, print_sql=print_sql)
+        database = DATABASE_REGISTRY.get(filepath=filepath, print_sql=print_sql)
     return database
@@ -0,0 +1,165 @@
+"""Incremental change feed of a Things database."""
+
+import base64
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from things.database import (
+    DATE_MODIFIED,
+    TABLE_AREA,
+    TABLE_AREATAG,
+    TABLE_TAG,
+    TABLE_TASK,
+    TABLE_TASKTAG,
+    Database,
+    chunked,
+    keyed_dict_factory,
+    make_checklist_items_sql_query,
+    make_placeholders,
+    tuple_factory,
+)
+from things.fts import get_changed_uuids, get_deleted_uuids, get_watermark
+
+
+def get_changes(database: Database, since: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Return the objects changed since the watermark `since`.
+
+    See `things.api.changes` for details.
+    """
+    # Read the watermark first, so that no change slips through.
+    time = get_watermark(database)
+    area_digests = get_digests(database, TABLE_AREA)
+    tag_digests = get_digests(database, TABLE_TAG)
+
+    if since is None:
+        last_time = None
+        changed_areas = list(area_digests)
+        changed_tags = list(tag_digests)
+        deleted = []
+    else:
+        last_time, last_area_digests, last_tag_digests = decode_watermark(since)
+        changed_areas = get_changed_keys(last_area_digests, area_digests)
+        changed_tags = get_changed_keys(last_tag_digests, tag_digests)
+        deleted = get_deleted_uuids(database, last_time)
+        deleted += [
+            uuid
+            for uuid in (*last_area_digests, *last_tag_digests)
+            if uuid not in area_digests and uuid not in tag_digests
+        ]
+
+    task_uuids = get_changed_task_uuids(
+        database, last_time, changed_areas, changed_tags
+    )
+    task_rows = database.get_tasks_by_uuids(task_uuids)
+    area_rows = database.get_areas(uuid=changed_areas) if changed_areas else []
+
+    return {
+        "tasks": task_rows,
+        "checklist_items": get_changed_checklist_items(database, last_time),
+        "areas": area_rows,
+        "deleted": list(dict.fromkeys(deleted)),
+        "watermark": encode_watermark(time, area_digests, tag_digests),
+    }
+
+
+def decode_watermark(watermark: str):
+    """
+    Return the time and digests encoded in a watermark.
+
+    Raise `ValueError` if `watermark` was not returned by `get_changes`.
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(watermark.encode()))
+        return float(data["time"]), dict(data["areas"]), dict(data["tags"])
+    except (AttributeError, TypeError, KeyError, ValueError) as error:
+        raise ValueError(f"Invalid watermark: {watermark!r}") from error
+
+
+def encode_watermark(time: float, area_digests, tag_digests) -> str:
+    """
+    Return an opaque watermark for `get_changes`.
+
+    Examples
+    --------
+    >>> watermark = encode_watermark(1.5, {'A': '01'}, {})
+    >>> decode_watermark(watermark)
+    (1.5, {'A': '01'}, {})
+    """
+    data = {"time": time, "areas": area_digests, "tags": tag_digests}
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+
+def get_changed_checklist_items(database: Database, since: Optional[float]) -> list:
+    """Return the checklist items changed after `since`, with their to-do."""
+    where_predicate = "TRUE" if since is None else f"{DATE_MODIFIED} >= ?"
+    parameters = () if since is None else (since,)
+    rows = database.execute_query(
+        make_checklist_items_sql_query(where_predicate),
+        parameters,
+        row_factory=keyed_dict_factory,
+    )
+    return [{**checklist_item, "task": task_uuid} for task_uuid, checklist_item in rows]
+
+
+def get_changed_keys(last_digests: Dict[str, str], digests: Dict[str, str]):
+    """Return the keys of `digests` that are new or have another value."""
+    return [key for key, digest in digests.items() if last_digests.get(key) != digest]
+
+
+def get_changed_task_uuids(
+    database: Database,
+    since: Optional[float],
+    area_uuids: List[str],
+    tag_uuids: List[str],
+) -> List[str]:
+    """
+    Return uuids of tasks whose rows changed after `since`.
+
+    Besides tasks and their checklist items, changed projects, headings,
+    areas, and tags change the titles within the rows of their tasks,
+    see `things.fts.get_changed_uuids`.
+    """
+    if since is None:
+        sql_query = f"SELECT uuid FROM {TABLE_TASK}"
+        rows = database.execute_query(sql_query, row_factory=tuple_factory)
+        return [uuid for uuid, in rows]
+
+    result = dict.fromkeys(get_changed_uuids(database, since))
+
+    for chunk in chunked(area_uuids):
+        sql_query = f"""
+            SELECT uuid FROM {TABLE_TASK}
+            WHERE area IN ({make_placeholders(len(chunk))})
+            """
+        rows = database.execute_query(sql_query, chunk, row_factory=tuple_factory)
+        result.update((uuid, None) for uuid, in rows)
+    for chunk in chunked(tag_uuids):
+        sql_query = f"""
+            SELECT tasks FROM {TABLE_TASKTAG}
+            WHERE tags IN ({make_placeholders(len(chunk))})
+            """
+        rows = database.execute_query(sql_query, chunk, row_factory=tuple_factory)
+        result.update((uuid, None) for uuid, in rows)
+    return list(result)
+
+
+def get_digests(database: Database, table: str) -> Dict[str, str]:
+    """
+    Return a dict mapping uuids of areas or tags to digests of their rows.
+
+    Areas and tags do not have a modification date, so their changes
+    are detected by comparing digests. The digest of an area includes
+    its tags.
+    """
+    tags = ""
+    if table == TABLE_AREA:
+        tags = f"""(
+            SELECT group_concat(tags) FROM {TABLE_AREATAG} WHERE areas = ROW.uuid
+        )"""
+    sql_query = f"SELECT uuid, title, {tags or 'NULL'} FROM {table} AS ROW"
+    rows = database.execute_query(sql_query, row_factory=tuple_factory)
+    return {
+        uuid: hashlib.sha1(repr(row).encode()).hexdigest()[:8] for uuid, *row in rows
+    }
@@ -2,14 +2,19 @@
 
 # pylint: disable=C0302
 
+import base64
+from collections import OrderedDict, namedtuple
 import datetime
+import functools
 import glob
+import json
 import os
 import plistlib
 import re
 import sqlite3
 from textwrap import dedent
-from typing import Optional, Union
+import threading
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple, Union
 import weakref
 
 
@@ -81,6 +86,18 @@ COLUMNS_TO_OMIT_IF_NONE = (
 )
 COLUMNS_TO_TRANSFORM_TO_BOOL = ("checklist", "tags", "trashed")
 
+# Types of returned rows: dicts or compact records, see `Record`.
+ROW_TYPES = ("dict", "record")
+
+# Batching
+
+# Maximum number of parameters bound in a single query. This is the
+# compile-time default `SQLITE_MAX_VARIABLE_NUMBER` of SQLite < 3.32.
+MAX_PARAMETERS_PER_QUERY = 999
+
+# Number of rows fetched at a time when streaming results, see `Database.iter_query`.
+DEFAULT_BATCH_SIZE = 500
+
 # --------------------------------------------------
 # Table names
 # --------------------------------------------------
@@ -111,6 +128,29 @@ DATE_START = "startDate"  # INTEGER: YYYYYYYYYYYMMMMDDDDD0000000, in binary
 # See 'convert_thingstime_sql_expression_to_isotime' for details.
 REMINDER_TIME = "reminderTime"  # INTEGER: hhhhhmmmmmm00000000000000000000, in binary
 
+# Columns to order by, see `Database.get_tasks`. The raw columns are used
+# rather than their converted values, so that SQLite can use indexes.
+ORDER_BY_COLUMNS = {
+    "created": f"TASK.{DATE_CREATED}",
+    "deadline": f"TASK.{DATE_DEADLINE}",
+    "index": 'TASK."index"',
+    "modified": f"TASK.{DATE_MODIFIED}",
+    "start_date": f"TASK.{DATE_START}",
+    "stop_date": f"TASK.{DATE_STOP}",
+    "title": "TASK.title",
+    "today_index": "TASK.todayIndex",
+}
+
+# Columns the tasks can be ordered by, including those of the Today view
+# and the uuid as tie-breaker. A cursor holds their values, see
+# `Database.get_cursor`.
+SORT_KEY_COLUMNS = {
+    **ORDER_BY_COLUMNS,
+    # Parenthesized, as it is compared with other values, see `make_keyset_filter`.
+    "someday": f"(TASK.{START_TO_FILTER['Someday']})",
+    "uuid": "TASK.uuid",
+}
+
 # --------------------------------------------------
 # Various filters
 # --------------------------------------------------
@@ -168,30 +208,82 @@ class Database:
         characters which correspond to SQLite parameter tokens.
         See https://www.sqlite.org/lang_expr.html#varparam
 
+    cached_statements : int, default 128
+        Number of prepared statements SQLite keeps for reuse. Queries
+        only differ in their parameters for the same kind of filters,
+        so repeated API calls can reuse their statements.
+
+    cache_size : int, default 0
+        Number of query results to keep in a least recently used cache.
+        Cached results are dropped as soon as the database changes, as
+        indicated by `PRAGMA data_version` and the WAL file's mtime.
+        Use 0 to disable caching.
+
+    snapshot : bool, default False
+        Copy the database, including pending WAL content, into memory
+        and answer all queries from there. This gives a consistent view
+        across queries and avoids disk I/O and lock contention with the
+        Things app. Call `refresh` to pick up changes.
+
+    thread_safe : bool, default False
+        Allow using the database from several threads at once. Each
+        thread then reads through a connection of its own, opened on
+        first use and closed when the thread exits, and changes are
+        detected on a shared connection. Can not be combined with
+        `snapshot`.
+
     :raises AssertionError: If the database version is too old.
     """
 
     debug = False
-    connection: sqlite3.Connection
 
     # pylint: disable=R0913
-    def __init__(self, filepath=None, print_sql=False):
+    def __init__(  # pylint: disable=R0917
+        self,
+        filepath=None,
+        print_sql=False,
+        cached_statements=128,
+        cache_size=0,
+        snapshot=False,
+        thread_safe=False,
+    ):
         """Set up the database."""
-        self.filepath = (
-            filepath
-            or os.getenv(ENVIRONMENT_VARIABLE_WITH_FILEPATH)
-            or DEFAULT_FILEPATH
-        )
+        if snapshot and thread_safe:
+            raise ValueError("A snapshot can not be shared between threads")
+
+        self.filepath = resolve_filepath(filepath)
         self.print_sql = print_sql
+        self.cache_size = cache_size
+        self.snapshot = snapshot
+        self.thread_safe = thread_safe
+        self.cached_statements = cached_statements
+        # Guards the caches and `source_connection`.
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._result_cache: OrderedDict = OrderedDict()
+        self._result_cache_version = None
+        # Tag titles by uuid and the set of titles, see `get_tag_titles`.
+        self._tag_titles: Tuple[Any, Dict[str, str], FrozenSet[str]] = (
+            None,
+            {},
+            frozenset(),
+        )
         if self.print_sql:
             self.execute_query_count = 0
 
         # "ro" means read-only
         # See: https://sqlite.org/uri.html#recognized_query_parameters
-        uri = f"file:{self.filepath}?mode=ro"  # noqa
-        self.connection = sqlite3.connect(uri, uri=True)  # pylint: disable=E1101
-        # Close the underlying SQLite connection when this Database object is garbage collected
-        weakref.finalize(self, sqlite3.Connection.close, self.connection)
+        self.uri = f"file:{self.filepath}?mode=ro"  # noqa
+        # Queries run against `connection`, changes are detected on `source_connection`.
+        self.source_connection = self.connect(self.uri)
+        self._connection = self.source_connection
+        if snapshot:
+            self._connection = self.connect(":memory:")
+        self._connections = [self.source_connection, self._connection]
+        # Close the underlying SQLite connections when this Database object is garbage collected
+        self._finalizer = weakref.finalize(self, close_connections, self._connections)
+        self._snapshot_version = None
+        self.refresh()
 
         # Test for migrated database in Things 3.15.16+
         # --------------------------------
@@ -211,17 +303,69 @@ class Database:
             pass  # binary file (old database) or doesn't exist
         # --------------------------------
 
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """
+        Return the SQLite connection to run queries on.
+
+        With `thread_safe=True`, that is a connection of the current
+        thread, which is opened on first use.
+        """
+        if not self.thread_safe:
+            return self._connection
+        thread_connection = getattr(self._local, "thread_connection", None)
+        if thread_connection is None:
+            connection = self.connect(self.uri)
+            with self._lock:
+                self._connections.append(connection)
+            thread_connection = ThreadConnection(
+                connection, self._connections, self._lock
+            )
+            self._local.thread_connection = thread_connection
+        return thread_connection.connection
+
+    def connect(self, uri) -> sqlite3.Connection:
+        """Open a new SQLite connection with the settings of this database."""
+        return sqlite3.connect(  # pylint: disable=E1101
+            uri,
+            uri=uri.startswith("file:"),
+            cached_statements=self.cached_statements,
+            # Connections of a thread-safe database are closed by any thread.
+            check_same_thread=not self.thread_safe,
+        )
+
+    def close(self):
+        """Close the underlying SQLite connections."""
+        self._finalizer()
+
+    def refresh(self):
+        """
+        Update the in-memory snapshot if the database file has changed.
+
+        Return True if a new snapshot was taken. Without `snapshot=True`,
+        queries always see the current data and this does nothing.
+        """
+        if not self.snapshot:
+            return False
+        version = self.get_source_version()
+        if version == self._snapshot_version:
+            return False
+        with self._lock:
+            self.source_connection.backup(self.connection)
+        self._snapshot_version = version
+        return True
+
     # Core methods
 
     def get_tasks(  # pylint: disable=R0914,R0913,R0917
         self,
         uuid: Optional[str] = None,
         type: Optional[str] = None,  # pylint: disable=W0622
-        status: Optional[str] = None,
+        status: Optional[Union[str, List[str]]] = None,
         start: Optional[str] = None,
         area: Optional[Union[str, bool]] = None,
-        project: Optional[Union[str, bool]] = None,
-        heading: Optional[str] = None,
+        project: Optional[Union[str, bool, List[str]]] = None,
+        heading: Optional[Union[str, List[str]]] = None,
         tag: Optional[Union[str, bool]] = None,
         start_date: Optional[Union[str, bool]] = None,
         stop_date: Optional[Union[str, bool]] = None,
@@ -233,10 +377,25 @@ class Database:
         search_query: Optional[str] = None,
         index: str = "index",
         count_only: bool = False,
+        uuids: Optional[List[str]] = None,
+        today: bool = False,
+        order_by: Optional[Union[str, List[str]]] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        fields: Optional[Union[str, List[str]]] = None,
+        batch_size: Optional[int] = None,
+        row_type: str = "dict",
     ):
-        """Get tasks. See `things.api.tasks` for details on parameters."""
+        """
+        Get tasks. See `things.api.tasks` for details on parameters.
+
+        If `batch_size` is given, return an iterator over lists of at
+        most `batch_size` tasks instead of a list, see `iter_query`.
+        """
         if uuid:
-            return self.get_task_by_uuid(uuid, count_only=count_only)
+            return self.get_task_by_uuid(
+                uuid, count_only=count_only, fields=fields, row_type=row_type
+            )
 
         # Overwrites
         start = start and start.title()
@@ -247,23 +406,39 @@ class Database:
         validate("start", start, [None] + list(START_TO_FILTER))
         validate_date("start_date", start_date)
         validate_date("stop_date", stop_date)
-        validate("status", status, [None] + list(STATUS_TO_FILTER))
+        statuses = status if isinstance(status, (list, tuple)) else [status]
+        for value in statuses:
+            validate("status", value, [None] + list(STATUS_TO_FILTER))
         validate("trashed", trashed, [None] + list(TRASHED_TO_FILTER))
         validate("type", type, [None] + list(TYPE_TO_FILTER))
         validate("context_trashed", context_trashed, [None, True, False])
         validate("index", index, list(INDICES))
+        validate("today", today, [True, False])
+        order_bys = order_by if isinstance(order_by, (list, tuple)) else [order_by]
+        for value in order_bys:
+            if isinstance(value, str):
+                value = value.lstrip("-")
+            validate("order_by", value, [None] + list(ORDER_BY_COLUMNS))
+        validate_limit("limit", limit)
+        after = None if after is None else decode_cursor(after)
+        fields = validate_fields(fields)
+        validate("row_type", row_type, list(ROW_TYPES))
         validate_offset("last", last)
 
-        if tag is not None:
-            valid_tags = self.get_tags(titles_only=True)
-            validate("tag", tag, [None] + list(valid_tags))
+        tag = self.resolve_tag("tag", tag)
 
         # Query
-        # TK: might consider executing SQL with parameters instead.
+        # Filter values are passed as SQL parameters. That way, the query
+        # text only depends on which filters are used, and SQLite can
+        # reuse its prepared statements.
         # See: https://docs.python.org/3/library/sqlite3.html#sqlite3.Cursor.execute
 
         start_filter: str = START_TO_FILTER.get(start, "")  # type: ignore
-        status_filter: str = STATUS_TO_FILTER.get(status, "")  # type: ignore
+        status_filter = " OR ".join(
+            f"TASK.{STATUS_TO_FILTER[value]}" for value in statuses if value
+        )
+        if len(statuses) > 1:
+            status_filter = f"({status_filter})"
         trashed_filter: str = TRASHED_TO_FILTER.get(trashed, "")  # type: ignore
         type_filter: str = TYPE_TO_FILTER.get(type, "")  # type: ignore
 
@@ -276,6 +451,9 @@ class Database:
             "PROJECT_OF_HEADING.trashed", context_trashed
         )
 
+        paged = limit is not None or after is not None
+        order_keys = make_order_keys(index, today, order_bys, paged)
+
         # As a task assigned to a heading is not directly assigned to a project anymore,
         # we need to check if the heading is assigned to a project.
         # See, e.g. https://github.com/thingsapi/things.py/issues/94
@@ -284,124 +462,223 @@ class Database:
             make_filter("PROJECT_OF_HEADING.uuid", project),
         )
 
-        where_predicate = f"""
-            TASK.{IS_NOT_RECURRING}
-            {trashed_filter and f"AND TASK.{trashed_filter}"}
-            {project_trashed_filter}
-            {project_of_heading_trashed_filter}
-            {type_filter and f"AND TASK.{type_filter}"}
-            {start_filter and f"AND TASK.{start_filter}"}
-            {status_filter and f"AND TASK.{status_filter}"}
-            {make_filter('TASK.uuid', uuid)}
-            {make_filter("TASK.area", area)}
-            {project_filter}
-            {make_filter("TASK.heading", heading)}
-            {make_filter("TASK.deadlineSuppressionDate", deadline_suppressed)}
-            {make_filter("TAG.title", tag)}
-            {make_thingsdate_filter(f"TASK.{DATE_START}", start_date)}
-            {make_unixtime_filter(f"TASK.{DATE_STOP}", stop_date)}
-            {make_thingsdate_filter(f"TASK.{DATE_DEADLINE}", deadline)}
-            {make_unixtime_range_filter(f"TASK.{DATE_CREATED}", last)}
-            {make_search_filter(search_query)}
-            """
-        order_predicate = f'TASK."{index}"'
+        where_predicate, parameters = join_filters(
+            f"TASK.{IS_NOT_RECURRING}",
+            trashed_filter and f"AND TASK.{trashed_filter}",
+            project_trashed_filter,
+            project_of_heading_trashed_filter,
+            type_filter and f"AND TASK.{type_filter}",
+            start_filter and f"AND TASK.{start_filter}",
+            status_filter and f"AND {status_filter}",
+            make_filter("TASK.uuid", uuids),
+            make_filter("TASK.area", area),
+            project_filter,
+            make_filter("TASK.heading", heading),
+            make_filter("TASK.deadlineSuppressionDate", deadline_suppressed),
+            make_tag_filter(TABLE_TASKTAG, "tasks", "TASK.uuid", tag),
+            make_thingsdate_filter(f"TASK.{DATE_START}", start_date),
+            make_unixtime_filter(f"TASK.{DATE_STOP}", stop_date),
+            make_thingsdate_filter(f"TASK.{DATE_DEADLINE}", deadline),
+            make_unixtime_range_filter(f"TASK.{DATE_CREATED}", last),
+            make_search_filter(search_query),
+            make_today_filter() if today else "",
+            make_keyset_filter(order_keys, after),
+        )
+        order_predicate = ", ".join(
+            f"{SORT_KEY_COLUMNS[name]} DESC" if descending else SORT_KEY_COLUMNS[name]
+            for name, descending in order_keys
+        )
 
-        sql_query = make_tasks_sql_query(where_predicate, order_predicate)
+        # Counting does not need any column but the uuid.
+        sql_query = make_tasks_sql_query(
+            where_predicate, order_predicate, ["uuid"] if count_only else fields
+        )
+        if limit is not None:
+            sql_query = f"{sql_query}LIMIT ?\n"
+            parameters = (*parameters, limit)
 
         if count_only:
-            return self.get_count(sql_query)
+            return self.get_count(sql_query, parameters)
+
+        row_factory = TASK_RECORD_FACTORY if row_type == "record" else None
+
+        if batch_size:
+            return self.iter_query(
+                sql_query, parameters, row_factory=row_factory, batch_size=batch_size
+            )
+
+        return self.execute_query(sql_query, parameters, row_factory=row_factory)
 
-        return self.execute_query(sql_query)
+    def get_cursor(self, uuid):
+        """
+        Return a cursor pointing right after a task, see `things.api.cursor`.
 
-    def get_task_by_uuid(self, uuid, count_only=False):
+        The cursor encodes the current values of `SORT_KEY_COLUMNS` of
+        the task. Raise `ValueError` if there is no such task.
+        """
+        columns = ", ".join(SORT_KEY_COLUMNS.values())
+        sql_query = f"SELECT {columns} FROM {TABLE_TASK} AS TASK WHERE TASK.uuid = ?"
+        rows = self.execute_query(sql_query, (uuid,), row_factory=tuple_factory)
+        if not rows:
+            raise ValueError(f"No such task uuid found: {uuid!r}")
+        return encode_cursor(rows[0])
+
+    def get_task_by_uuid(self, uuid, count_only=False, fields=None, row_type="dict"):
         """Get a task by uuid. Raise `ValueError` if not found."""
+        fields = validate_fields(fields)
+        validate("row_type", row_type, list(ROW_TYPES))
         where_predicate = "TASK.uuid = ?"
-        sql_query = make_tasks_sql_query(where_predicate)
+        sql_query = make_tasks_sql_query(where_predicate, fields=fields)
         parameters = (uuid,)
 
         if count_only:
             return self.get_count(sql_query, parameters)
 
-        result = self.execute_query(sql_query, parameters)
+        row_factory = TASK_RECORD_FACTORY if row_type == "record" else None
+        result = self.execute_query(sql_query, parameters, row_factory=row_factory)
         if not result:
             raise ValueError(f"No such task uuid found: {uuid!r}")
 
         return result
 
-    def get_areas(self, uuid=None, tag=None, count_only=False):
+    def get_tasks_by_uuids(self, uuids, fields=None, row_type="dict"):
+        """
+        Get the tasks with any of `uuids`.
+
+        Like `get_task_by_uuid`, and unlike `get_tasks`, this includes
+        trashed and recurring tasks. Missing uuids are skipped.
+        """
+        fields = validate_fields(fields)
+        validate("row_type", row_type, list(ROW_TYPES))
+        row_factory = TASK_RECORD_FACTORY if row_type == "record" else None
+        result = []
+        for chunk in chunked(uuids):
+            where_predicate = f"TASK.uuid IN ({make_placeholders(len(chunk))})"
+            sql_query = make_tasks_sql_query(where_predicate, fields=fields)
+            result.extend(
+                self.execute_query(sql_query, tuple(chunk), row_factory=row_factory)
+            )
+        return result
+
+    def get_areas(self, uuid=None, tag=None, count_only=False, row_type="dict"):
         """Get areas. See `api.areas` for details on parameters."""
         # Validation
-        if tag is not None:
-            valid_tags = self.get_tags(titles_only=True)
-            validate("tag", tag, [None] + list(valid_tags))
-
-        if (
-            uuid
-            and count_only is False
-            and not self.get_areas(uuid=uuid, count_only=True)
-        ):
-            raise ValueError(f"No such area uuid found: {uuid!r}")
+        validate("row_type", row_type, list(ROW_TYPES))
+        tag = self.resolve_tag("tag", tag)
 
         # Query
+        where_predicate, parameters = join_filters(
+            "TRUE",
+            make_tag_filter(TABLE_AREATAG, "areas", "AREA.uuid", tag),
+            make_filter("AREA.uuid", uuid),
+        )
         sql_query = f"""
-            SELECT DISTINCT
+            SELECT
                 AREA.uuid,
                 'area' as type,
                 AREA.title,
                 CASE
-                    WHEN AREA_TAG.areas IS NOT NULL THEN 1
+                    WHEN EXISTS (
+                        SELECT 1 FROM {TABLE_AREATAG} AREA_TAG
+                        WHERE AREA_TAG.areas = AREA.uuid
+                    ) THEN 1
                 END AS tags
             FROM
                 {TABLE_AREA} AS AREA
-            LEFT OUTER JOIN
-                {TABLE_AREATAG} AREA_TAG ON AREA_TAG.areas = AREA.uuid
-            LEFT OUTER JOIN
-                {TABLE_TAG} TAG ON TAG.uuid = AREA_TAG.tags
             WHERE
-                TRUE
-                {make_filter('TAG.title', tag)}
-                {make_filter('AREA.uuid', uuid)}
+                {where_predicate}
             ORDER BY AREA."index"
             """
 
         if count_only:
-            return self.get_count(sql_query)
+            return self.get_count(sql_query, parameters)
 
-        return self.execute_query(sql_query)
+        row_factory = AREA_RECORD_FACTORY if row_type == "record" else None
+        result = self.execute_query(sql_query, parameters, row_factory=row_factory)
+        if uuid and not result:
+            raise ValueError(f"No such area uuid found: {uuid!r}")
+
+        return result
 
-    def get_checklist_items(self, todo_uuid=None):
+    def get_checklist_items(self, todo_uuid=None, row_type="dict"):
         """Get checklist items."""
-        sql_query = f"""
-            SELECT
-                CHECKLIST_ITEM.title,
-                CASE
-                    WHEN CHECKLIST_ITEM.{IS_INCOMPLETE} THEN 'incomplete'
-                    WHEN CHECKLIST_ITEM.{IS_CANCELED} THEN 'canceled'
-                    WHEN CHECKLIST_ITEM.{IS_COMPLETED} THEN 'completed'
-                END AS status,
-                date(CHECKLIST_ITEM.stopDate, "unixepoch", "localtime") AS stop_date,
-                'checklist-item' as type,
-                CHECKLIST_ITEM.uuid,
-                datetime(
-                    CHECKLIST_ITEM.{DATE_MODIFIED}, "unixepoch", "localtime"
-                ) AS created,
-                datetime(
-                    CHECKLIST_ITEM.{DATE_MODIFIED}, "unixepoch", "localtime"
-                ) AS modified
-            FROM
-                {TABLE_CHECKLIST_ITEM} AS CHECKLIST_ITEM
-            WHERE
-                CHECKLIST_ITEM.task = ?
-            ORDER BY CHECKLIST_ITEM."index"
-            """
-        return self.execute_query(sql_query, (todo_uuid,))
+        checklists = self.get_checklist_items_of_tasks([todo_uuid], row_type=row_type)
+        return checklists.get(todo_uuid, [])
+
+    def get_checklist_items_of_tasks(self, task_uuids, row_type="dict"):
+        """
+        Get checklist items of many to-dos at once.
+
+        Return a dict mapping to-do uuids to lists of checklist items.
+        To-dos without checklist items are omitted.
+        """
+        validate("row_type", row_type, list(ROW_TYPES))
+        row_factory = (
+            CHECKLIST_ITEM_RECORD_FACTORY
+            if row_type == "record"
+            else keyed_dict_factory
+        )
+        result = {}
+        for uuids in chunked(task_uuids):
+            sql_query = make_checklist_items_sql_query(
+                f"CHECKLIST_ITEM.task IN ({make_placeholders(len(uuids))})"
+            )
+            rows = self.execute_query(
+                sql_query, parameters=tuple(uuids), row_factory=row_factory
+            )
+            for task_uuid, checklist_item in rows:
+                result.setdefault(task_uuid, []).append(checklist_item)
+        return result
 
-    def get_tags(self, title=None, area=None, task=None, titles_only=False):
+    def get_projects_of_headings(self, heading_uuids):
+        """Return a dict mapping heading uuids to their project uuids."""
+        result = {}
+        for uuids in chunked(heading_uuids):
+            sql_query = f"""
+                SELECT
+                    uuid, project
+                FROM
+                    {TABLE_TASK}
+                WHERE
+                    uuid IN ({make_placeholders(len(uuids))})
+                """
+            rows = self.execute_query(
+                sql_query, parameters=tuple(uuids), row_factory=tuple_factory
+            )
+            result.update(rows)
+        return result
+
+    def get_types_of_uuids(self, uuids):
+        """
+        Return a dict mapping uuids to the type of object they belong to.
+
+        The type is 'task', 'area', or 'tag'. Missing uuids are left out.
+        Each chunk of uuids is looked up in the primary key indexes of
+        all three tables with a single query.
+        """
+        result = {}
+        for chunk in chunked(uuids, MAX_PARAMETERS_PER_QUERY // 3):
+            placeholders = make_placeholders(len(chunk))
+            sql_query = f"""
+                SELECT uuid, 'task' FROM {TABLE_TASK} WHERE uuid IN ({placeholders})
+                UNION ALL
+                SELECT uuid, 'area' FROM {TABLE_AREA} WHERE uuid IN ({placeholders})
+                UNION ALL
+                SELECT uuid, 'tag' FROM {TABLE_TAG} WHERE uuid IN ({placeholders})
+                """
+            rows = self.execute_query(
+                sql_query, parameters=tuple(chunk) * 3, row_factory=tuple_factory
+            )
+            result.update(rows)
+        return result
+
+    def get_tags(  # pylint: disable=R0913,R0917
+        self, title=None, area=None, task=None, titles_only=False, row_type="dict"
+    ):
         """Get tags. See `api.tags` for details on parameters."""
         # Validation
-        if title is not None:
-            valid_titles = self.get_tags(titles_only=True)
-            validate("title", title, [None] + list(valid_titles))
+        validate("row_type", row_type, list(ROW_TYPES))
+        title = self.resolve_tag("title", title)
 
         # Query
         if task:
@@ -413,18 +690,59 @@ class Database:
             sql_query = f'SELECT title FROM {TABLE_TAG} ORDER BY "index"'
             return self.execute_query(sql_query, row_factory=list_factory)
 
+        where_predicate, parameters = join_filters("TRUE", make_filter("title", title))
         sql_query = f"""
             SELECT
                 uuid, 'tag' AS type, title, shortcut
             FROM
                 {TABLE_TAG}
             WHERE
-                TRUE
-                {make_filter('title', title)}
+                {where_predicate}
             ORDER BY "index"
             """
 
-        return self.execute_query(sql_query)
+        row_factory = TAG_RECORD_FACTORY if row_type == "record" else None
+        return self.execute_query(sql_query, parameters, row_factory=row_factory)
+
+    def get_tag_titles(self) -> Dict[str, str]:
+        """
+        Return a dict mapping the uuids of all tags to their titles.
+
+        The tags are read once and then cached until the data changes,
+        see `get_data_version`.
+        """
+        return self._get_tag_cache()[1]
+
+    def _get_tag_cache(self):
+        """Return the version, titles by uuid, and set of tag titles."""
+        version = self.get_data_version()
+        tag_cache = self._tag_titles
+        if version != tag_cache[0] or version is None:
+            sql_query = f'SELECT uuid, title FROM {TABLE_TAG} ORDER BY "index"'
+            self.print_query(sql_query)
+            titles = dict(self.fetch_all(sql_query, row_factory=tuple_factory))
+            # Replaced as a whole, so that other threads see a consistent state.
+            tag_cache = self._tag_titles = (version, titles, frozenset(titles.values()))
+        return tag_cache
+
+    def resolve_tag(self, parameter, tag):
+        """
+        Validate a tag argument and return the tag title.
+
+        `tag` may be the title or the uuid of a tag, or a bool to match
+        items with or without tags. Raise `ValueError` if there is no
+        such tag.
+        """
+        if tag is None or isinstance(tag, bool):
+            return tag
+        _version, titles, title_set = self._get_tag_cache()
+        if isinstance(tag, str):
+            if tag in title_set:
+                return tag
+            if tag in titles:
+                return titles[tag]
+        validate(parameter, tag, [None] + list(titles.values()))
+        return tag
 
     def get_tags_of_task(self, task_uuid):
         """Get tag titles of task."""
@@ -443,6 +761,34 @@ class Database:
             sql_query, parameters=(task_uuid,), row_factory=list_factory
         )
 
+    def get_tags_of_tasks(self, task_uuids):
+        """
+        Get tag titles of many tasks at once.
+
+        Return a dict mapping task uuids to lists of tag titles, ordered
+        like in `get_tags_of_task`. Tasks without tags are omitted.
+        """
+        result = {}
+        for uuids in chunked(task_uuids):
+            sql_query = f"""
+                SELECT
+                    TASK_TAG.tasks,
+                    TAG.title
+                FROM
+                    {TABLE_TASKTAG} AS TASK_TAG
+                LEFT OUTER JOIN
+                    {TABLE_TAG} TAG ON TAG.uuid = TASK_TAG.tags
+                WHERE
+                    TASK_TAG.tasks IN ({make_placeholders(len(uuids))})
+                ORDER BY TAG."index"
+                """
+            rows = self.execute_query(
+                sql_query, parameters=tuple(uuids), row_factory=tuple_factory
+            )
+            for task_uuid, title in rows:
+                result.setdefault(task_uuid, []).append(title)
+        return result
+
     def get_tags_of_area(self, area_uuid):
         """Get tag titles for area."""
         sql_query = f"""
@@ -460,6 +806,34 @@ class Database:
             sql_query, parameters=(area_uuid,), row_factory=list_factory
         )
 
+    def get_tags_of_areas(self, area_uuids):
+        """
+        Get tag titles of many areas at once.
+
+        Return a dict mapping area uuids to lists of tag titles, ordered
+        like in `get_tags_of_area`. Areas without tags are omitted.
+        """
+        result = {}
+        for uuids in chunked(area_uuids):
+            sql_query = f"""
+                SELECT
+                    AREA_TAG.areas,
+                    TAG.title
+                FROM
+                    {TABLE_AREATAG} AS AREA_TAG
+                LEFT OUTER JOIN
+                    {TABLE_TAG} TAG ON TAG.uuid = AREA_TAG.tags
+                WHERE
+                    AREA_TAG.areas IN ({make_placeholders(len(uuids))})
+                ORDER BY TAG."index"
+                """
+            rows = self.execute_query(
+                sql_query, parameters=tuple(uuids), row_factory=tuple_factory
+            )
+            for area_uuid, title in rows:
+                result.setdefault(area_uuid, []).append(title)
+        return result
+
     def get_version(self):
         """Get Things Database version."""
         sql_query = f"SELECT value FROM {TABLE_META} WHERE key = 'databaseVersion'"
@@ -492,122 +866,371 @@ class Database:
     # noqa todo: add type hinting for resutl (List[Tuple[str, Any]]?)
     def execute_query(self, sql_query, parameters=(), row_factory=None):
         """Run the actual SQL query."""
-        if self.print_sql or self.debug:
-            if not hasattr(self, "execute_query_count"):
-                # This is needed for historical `self.debug`.
-                # TK: might consider removing `debug` flag.
-                self.execute_query_count = 0
-            self.execute_query_count += 1
-            if self.debug:
-                print(f"/* Filepath {self.filepath!r} */")
-            print(f"/* Query {self.execute_query_count} */")
-            if parameters:
-                print(f"/* Parameters: {parameters!r} */")
-            print()
-            print(prettify_sql(sql_query))
-            print()
-
-        with self.connection:
+        self.print_query(sql_query, parameters)
+
+        if not self.cache_size:
+            return self.fetch_all(sql_query, parameters, row_factory)
+
+        key = (sql_query, tuple(parameters), row_factory)
+        with self._lock:
+            version = self.get_data_version()
+            if version != self._result_cache_version:
+                self.clear_cache()
+                self._result_cache_version = version
+            rows = self._result_cache.get(key)
+            if rows is not None:
+                self._result_cache.move_to_end(key)
+
+        if rows is None:
+            # Run the query outside the lock, so that threads read concurrently.
+            rows = self.fetch_all(sql_query, parameters, row_factory)
+            with self._lock:
+                if version == self._result_cache_version:
+                    self._result_cache[key] = rows
+                    while len(self._result_cache) > self.cache_size:
+                        self._result_cache.popitem(last=False)
+
+        # Callers may modify the rows, e.g., `api.tasks` fills in tags.
+        return [copy_row(row) for row in rows]
+
+    def fetch_all(self, sql_query, parameters=(), row_factory=None):
+        """Run a SQL query and return all rows, bypassing any cache."""
+        connection = self.connection
+        with connection:
             # Using context manager to keep queries in separate transactions,
             # see https://docs.python.org/3/library/sqlite3.html#sqlite3-connection-context-manager
-            self.connection.row_factory = row_factory or dict_factory
-            cursor = self.connection.cursor()
+            cursor = connection.cursor()
+            # Set per cursor, so that other users of the connection are not affected.
+            cursor.row_factory = row_factory or dict_factory
             cursor.execute(sql_query, parameters)
 
             return cursor.fetchall()
 
+    def iter_query(
+        self,
+        sql_query,
+        parameters=(),
+        row_factory=None,
+        batch_size=DEFAULT_BATCH_SIZE,
+    ):
+        """
+        Run a SQL query and yield its rows in lists of up to `batch_size`.
+
+        Rows are fetched from the cursor as the iterator advances, so
+        only one batch is held in memory at a time. The result cache is
+        bypassed.
+        """
+        self.print_query(sql_query, parameters)
+        cursor = self.connection.cursor()
+        cursor.row_factory = row_factory or dict_factory
+        try:
+            cursor.execute(sql_query, parameters)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            cursor.close()
+
+    def print_query(self, sql_query, parameters=()):
+        """Print a SQL query if `print_sql` is enabled."""
+        if not (self.print_sql or self.debug):
+            return
+        if not hasattr(self, "execute_query_count"):
+            # This is needed for historical `self.debug`.
+            # TK: might consider removing `debug` flag.
+            self.execute_query_count = 0
+        self.execute_query_count += 1
+        if self.debug:
+            print(f"/* Filepath {self.filepath!r} */")
+        print(f"/* Query {self.execute_query_count} */")
+        if parameters:
+            print(f"/* Parameters: {parameters!r} */")
+        print()
+        print(prettify_sql(sql_query))
+        print()
+
+    def get_data_version(self):
+        """
+        Return a value that changes whenever the queried data has changed.
+
+        For snapshots, that is when `refresh` took a new snapshot.
+        """
+        if self.snapshot:
+            return self._snapshot_version
+        return self.get_source_version()
+
+    def get_source_version(self):
+        """
+        Return a value that changes whenever the database file has changed.
+
+        `PRAGMA data_version` changes when another connection (e.g., the
+        Things app) commits. The mtimes of the database and WAL files catch
+        changes that are not yet visible to that pragma.
+        """
+        with self._lock:
+            cursor = self.source_connection.cursor()
+            data_version = cursor.execute("PRAGMA data_version").fetchone()[0]
+        return (data_version, *get_mtimes(self.filepath))
+
+    def clear_cache(self):
+        """Drop all cached query results."""
+        self._result_cache.clear()
+
+
+class DatabaseRegistry:
+    """
+    Reuse open `Database` objects across API calls.
+
+    Opening a database means connecting to SQLite and checking the
+    database version. The registry keeps recently used databases open,
+    keyed by their resolved filepath, and hands them out again.
+
+    SQLite connections are bound to the thread that created them, so
+    each thread has its own set of open databases. When more than
+    `max_open` databases are open in a thread, the registry forgets the
+    least recently used one. It is closed once nobody uses it anymore,
+    e.g., once an iterator of `things.api.iter_tasks` reading from it is
+    exhausted.
+
+    Parameters
+    ----------
+    max_open : int, default 8
+        Maximum number of databases kept open per thread.
+    """
+
+    def __init__(self, max_open=8):
+        self.max_open = max_open
+        self._local = threading.local()
+
+    def get(self, filepath=None, print_sql=False):
+        """Return an open `Database` for `filepath`, opening it if needed."""
+        filepath = resolve_filepath(filepath)
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            # Let `Database` raise the appropriate error.
+            return Database(filepath=filepath, print_sql=print_sql)
+
+        databases = self._databases()
+        key = (os.path.realpath(filepath), print_sql)
+        # A replaced file (e.g., restored from a backup) needs a new connection.
+        file_id = (stat.st_dev, stat.st_ino)
+
+        entry = databases.pop(key, None)
+        if entry is None or entry[0] != file_id:
+            entry = (file_id, Database(filepath=filepath, print_sql=print_sql))
+        databases[key] = entry
+
+        # Databases still in use by callers stay open until they are
+        # garbage collected, see `Database._finalizer`.
+        while len(databases) > max(self.max_open, 0):
+            databases.popitem(last=False)
+
+        return entry[1]
+
+    def clear(self):
+        """Close all databases opened by the current thread."""
+        databases = self._databases()
+        while databases:
+            _, (_, database) = databases.popitem()
+            database.close()
+
+    def _databases(self):
+        """Return the databases opened by the current thread, oldest first."""
+        if not hasattr(self._local, "databases"):
+            self._local.databases = OrderedDict()
+        return self._local.databases
+
+
+DATABASE_REGISTRY = DatabaseRegistry()
+
+
+class Record(tuple):
+    """
+    Base class of the compact rows returned for `row_type='record'`.
+
+    Records are immutable named tuples, so fields can be accessed as
+    attributes, e.g., `task.title`. For compatibility with dict rows,
+    `task['title']` and `task.get('title')` work as well.
+
+    Columns keep their raw values. Those that `dict_factory` turns into
+    booleans are converted on access, and `_asdict` omits the columns
+    that `dict_factory` omits when None. So `record._asdict()` equals the
+    dict row of the same query.
+    """
+
+    __slots__ = ()
+
+    _fields: Tuple[str, ...]  # set by `namedtuple`, see `make_record_type`
+    _omit_if_none = (*COLUMNS_TO_OMIT_IF_NONE, "items")
+
+    def __getitem__(self, key):
+        """Return a field by name, like the dict row would, or by position."""
+        if not isinstance(key, str):
+            return super().__getitem__(key)
+        value = getattr(self, key) if key in self._fields else None
+        if value is None and (key not in self._fields or key in self._omit_if_none):
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        """Return a field by name, like `dict.get` on the dict row would."""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def _asdict(self):
+        """Return the record as dict, as `dict_factory` would."""
+        result = {}
+        for key in self._fields:
+            value = getattr(self, key)
+            if value is None and key in self._omit_if_none:
+                continue
+            result[key] = value
+        return result
+
+
+class RecordFactory:  # pylint: disable=R0903
+    """
+    Row factory creating `Record` rows.
+
+    The record type is created once per query shape, that is, per set of
+    column names, rather than once per row.
+
+    Parameters
+    ----------
+    name : str
+        Name of the record type, e.g., 'Task'.
+
+    extra_fields : tuple of str, optional
+        Fields appended to the columns of the query and set to None.
+        Used for data filled in later, e.g., the `items` of projects.
+
+    keyed : bool, default False
+        Return `(key, record)` pairs with the first column as key, like
+        `keyed_dict_factory`.
+    """
+
+    def __init__(self, name, extra_fields=(), keyed=False):
+        self.name = name
+        self.extra_fields = tuple(extra_fields)
+        self.keyed = keyed
+        # Description of the last query and its record type. Kept in one
+        # attribute, so that concurrent queries never mix them up.
+        self._last_shape = (None, None)
+
+    def __call__(self, cursor, row):
+        """Convert SQL result into a record."""
+        description, record_type = self._last_shape
+        if cursor.description is not description:
+            description = cursor.description
+            fields = tuple(column[0] for column in description[self.keyed :])
+            record_type = make_record_type(self.name, fields + self.extra_fields)
+            self._last_shape = (description, record_type)
+
+        values = row[1:] if self.keyed else row
+        record = record_type._make(values + (None,) * len(self.extra_fields))
+        return (row[0], record) if self.keyed else record
+
+
+AREA_RECORD_FACTORY = RecordFactory("Area", extra_fields=("items",))
+CHECKLIST_ITEM_RECORD_FACTORY = RecordFactory("ChecklistItem", keyed=True)
+TAG_RECORD_FACTORY = RecordFactory("Tag", extra_fields=("items",))
+TASK_RECORD_FACTORY = RecordFactory("Task", extra_fields=("items",))
+
+
+class ThreadConnection:  # pylint: disable=R0903
+    """
+    SQLite connection of one thread of a thread-safe `Database`.
+
+    It is kept in thread-local storage, which Python clears when the
+    thread exits. The connection is then closed and removed from the
+    open `connections`, so that short-lived threads do not leak them.
+    """
+
+    def __init__(self, connection, connections, lock):
+        self.connection = connection
+        weakref.finalize(self, release_connection, connection, connections, lock)
+
 
 # Helper functions
 
 
-def make_tasks_sql_query(where_predicate=None, order_predicate=None):
-    """Make SQL query for Task table."""
+def make_checklist_items_sql_query(where_predicate):
+    """
+    Make SQL query for ChecklistItem table.
+
+    The first column is the uuid of the to-do an item belongs to, see
+    `keyed_dict_factory`.
+    """
+    return f"""
+            SELECT
+                CHECKLIST_ITEM.task,
+                CHECKLIST_ITEM.title,
+                CASE
+                    WHEN CHECKLIST_ITEM.{IS_INCOMPLETE} THEN 'incomplete'
+                    WHEN CHECKLIST_ITEM.{IS_CANCELED} THEN 'canceled'
+                    WHEN CHECKLIST_ITEM.{IS_COMPLETED} THEN 'completed'
+                END AS status,
+                date(CHECKLIST_ITEM.stopDate, "unixepoch", "localtime") AS stop_date,
+                'checklist-item' as type,
+                CHECKLIST_ITEM.uuid,
+                datetime(
+                    CHECKLIST_ITEM.{DATE_MODIFIED}, "unixepoch", "localtime"
+                ) AS created,
+                datetime(
+                    CHECKLIST_ITEM.{DATE_MODIFIED}, "unixepoch", "localtime"
+                ) AS modified
+            FROM
+                {TABLE_CHECKLIST_ITEM} AS CHECKLIST_ITEM
+            WHERE
+                {where_predicate}
+            ORDER BY CHECKLIST_ITEM."index"
+            """
+
+
+def make_tasks_sql_query(where_predicate=None, order_predicate=None, fields=None):
+    """
+    Make SQL query for Task table.
+
+    Only select the columns of `fields`, by default all of them, see
+    `make_task_columns`. `uuid` is always selected. Joins are only
+    made if a column or a predicate refers to them.
+    """
     where_predicate = where_predicate or "TRUE"
     order_predicate = order_predicate or 'TASK."index"'
 
-    start_date_expression = convert_thingsdate_sql_expression_to_isodate(
-        f"TASK.{DATE_START}"
+    columns = ",\n                ".join(
+        column
+        for field, column in make_task_columns().items()
+        if fields is None or field == "uuid" or field in fields
     )
-    deadline_expression = convert_thingsdate_sql_expression_to_isodate(
-        f"TASK.{DATE_DEADLINE}"
-    )
-    reminder_time_expression = convert_thingstime_sql_expression_to_isotime(
-        f"TASK.{REMINDER_TIME}"
+
+    joins = {
+        "PROJECT": f"{TABLE_TASK} PROJECT ON TASK.project = PROJECT.uuid",
+        "AREA": f"{TABLE_AREA} AREA ON TASK.area = AREA.uuid",
+        "HEADING": f"{TABLE_TASK} HEADING ON TASK.heading = HEADING.uuid",
+        "PROJECT_OF_HEADING": f"{TABLE_TASK} PROJECT_OF_HEADING\n"
+        "                ON HEADING.project = PROJECT_OF_HEADING.uuid",
+    }
+    text = f"{columns} {where_predicate} {order_predicate}"
+    aliases = {alias for alias in joins if re.search(rf"\b{alias}\.", text)}
+    if "PROJECT_OF_HEADING" in aliases:
+        aliases.add("HEADING")
+    join_clauses = "".join(
+        f"\n            LEFT OUTER JOIN\n                {join}"
+        for alias, join in joins.items()
+        if alias in aliases
     )
 
     return f"""
-            SELECT DISTINCT
-                TASK.uuid,
-                CASE
-                    WHEN TASK.{IS_TODO} THEN 'to-do'
-                    WHEN TASK.{IS_PROJECT} THEN 'project'
-                    WHEN TASK.{IS_HEADING} THEN 'heading'
-                END AS type,
-                CASE
-                    WHEN TASK.{IS_TRASHED} THEN 1
-                END AS trashed,
-                TASK.title,
-                CASE
-                    WHEN TASK.{IS_INCOMPLETE} THEN 'incomplete'
-                    WHEN TASK.{IS_CANCELED} THEN 'canceled'
-                    WHEN TASK.{IS_COMPLETED} THEN 'completed'
-                END AS status,
-                CASE
-                    WHEN AREA.uuid IS NOT NULL THEN AREA.uuid
-                END AS area,
-                CASE
-                    WHEN AREA.uuid IS NOT NULL THEN AREA.title
-                END AS area_title,
-                CASE
-                    WHEN PROJECT.uuid IS NOT NULL THEN PROJECT.uuid
-                END AS project,
-                CASE
-                    WHEN PROJECT.uuid IS NOT NULL THEN PROJECT.title
-                END AS project_title,
-                CASE
-                    WHEN HEADING.uuid IS NOT NULL THEN HEADING.uuid
-                END AS heading,
-                CASE
-                    WHEN HEADING.uuid IS NOT NULL THEN HEADING.title
-                END AS heading_title,
-                TASK.notes,
-                CASE
-                    WHEN TAG.uuid IS NOT NULL THEN 1
-                END AS tags,
-                CASE
-                    WHEN TASK.{IS_INBOX} THEN 'Inbox'
-                    WHEN TASK.{IS_ANYTIME} THEN 'Anytime'
-                    WHEN TASK.{IS_SOMEDAY} THEN 'Someday'
-                END AS start,
-                CASE
-                    WHEN CHECKLIST_ITEM.uuid IS NOT NULL THEN 1
-                END AS checklist,
-                {start_date_expression} AS start_date,
-                {deadline_expression} AS deadline,
-                {reminder_time_expression} AS "reminder_time",
-                datetime(TASK.{DATE_STOP}, "unixepoch", "localtime") AS "stop_date",
-                datetime(TASK.{DATE_CREATED}, "unixepoch", "localtime") AS created,
-                datetime(TASK.{DATE_MODIFIED}, "unixepoch", "localtime") AS modified,
-                TASK.'index',
-                TASK.todayIndex AS today_index
+            SELECT
+                {columns}
             FROM
-                {TABLE_TASK} AS TASK
-            LEFT OUTER JOIN
-                {TABLE_TASK} PROJECT ON TASK.project = PROJECT.uuid
-            LEFT OUTER JOIN
-                {TABLE_AREA} AREA ON TASK.area = AREA.uuid
-            LEFT OUTER JOIN
-                {TABLE_TASK} HEADING ON TASK.heading = HEADING.uuid
-            LEFT OUTER JOIN
-                {TABLE_TASK} PROJECT_OF_HEADING
-                ON HEADING.project = PROJECT_OF_HEADING.uuid
-            LEFT OUTER JOIN
-                {TABLE_TASKTAG} TAGS ON TASK.uuid = TAGS.tasks
-            LEFT OUTER JOIN
-                {TABLE_TAG} TAG ON TAGS.tags = TAG.uuid
-            LEFT OUTER JOIN
-                {TABLE_CHECKLIST_ITEM} CHECKLIST_ITEM
-                ON TASK.uuid = CHECKLIST_ITEM.task
+                {TABLE_TASK} AS TASK{join_clauses}
             WHERE
                 {where_predicate}
             ORDER BY
@@ -618,6 +1241,31 @@ def make_tasks_sql_query(where_predicate=None, order_predicate=None):
 #  In alphabetical order from here...
 
 
+def chunked(iterable, size=MAX_PARAMETERS_PER_QUERY):
+    """
+    Split an iterable into lists of at most `size` items.
+
+    Examples
+    --------
+    >>> list(chunked('abcde', 2))
+    [['a', 'b'], ['c', 'd'], ['e']]
+    """
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def close_connections(connections):
+    """Close SQLite connections."""
+    for connection in connections:
+        connection.close()
+
+
 def convert_isodate_sql_expression_to_thingsdate(sql_expression, null_possible=True):
     """
     Return a SQL expression of an isodate converted into a "Things date".
@@ -753,6 +1401,48 @@ def convert_thingstime_sql_expression_to_isotime(sql_expression: str) -> str:
     return f"CASE WHEN {thingstime} THEN {isotime} ELSE {thingstime} END"
 
 
+def copy_row(row):
+    """
+    Return a copy of a result row that is safe to modify.
+
+    Examples
+    --------
+    >>> row = ('uuid', {'title': 'Home'})
+    >>> copy_row(row)[1] is row[1]
+    False
+    """
+    if isinstance(row, dict):
+        return dict(row)
+    if isinstance(row, Record):
+        # Records are immutable and can be shared.
+        return row
+    if isinstance(row, tuple):
+        return tuple(copy_row(value) for value in row)
+    return row
+
+
+def decode_cursor(cursor):
+    """
+    Return the values of `SORT_KEY_COLUMNS` encoded in a cursor.
+
+    Raise `ValueError` if `cursor` was not returned by `encode_cursor`.
+
+    Examples
+    --------
+    >>> decode_cursor('invalid')
+    Traceback (most recent call last):
+    ...
+    ValueError: Invalid cursor: 'invalid'
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(SORT_KEY_COLUMNS):
+            raise ValueError(cursor)
+    except (AttributeError, TypeError, ValueError) as error:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from error
+    return dict(zip(SORT_KEY_COLUMNS, values))
+
+
 def dict_factory(cursor, row):
     """
     Convert SQL result into a dictionary.
@@ -771,28 +1461,25 @@ def dict_factory(cursor, row):
     return result
 
 
-def escape_string(string):
-    r"""
-    Escape SQLite string literal.
-
-    Three notes:
+def get_bool_field(record, index):
+    """Return a field of a record, converted to bool like `dict_factory` does."""
+    value = tuple.__getitem__(record, index)
+    if value and isinstance(value, int):
+        return bool(value)
+    return value
 
-    1. A single quote within a SQLite string can be encoded by putting
-    two single quotes in a row. Escapes using the backslash character
-    are not supported in SQLite.
 
-    2. Null characters '\0' within strings can lead to surprising
-    behavior. However, `cursor.execute` will already throw a `ValueError`
-    if it finds a null character in the query, so we let it handle
-    this case for us.
-
-    3. Eventually we might want to make use of parameters instead of
-    manually escaping. Since this will require some refactoring,
-    we are going with the easiest solution for now.
+def encode_cursor(values):
+    """
+    Return an opaque cursor holding the values of `SORT_KEY_COLUMNS`.
 
-    See: https://www.sqlite.org/lang_expr.html#literal_values_constants_
+    Examples
+    --------
+    >>> values = (1.5, None, 3, 4.5, None, 6.5, 'Title', 7, 0, 'A')
+    >>> decode_cursor(encode_cursor(values))['title']
+    'Title'
     """
-    return string.replace("'", "''")
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode()).decode()
 
 
 def isodate_to_yyyyyyyyyyymmmmddddd(value: str):
@@ -816,71 +1503,417 @@ def isodate_to_yyyyyyyyyyymmmmddddd(value: str):
     return year << 16 | month << 12 | day << 7
 
 
+def join_filters(*filters):
+    r"""
+    Join SQL filters into one predicate and its parameters.
+
+    Each filter is either a SQL str without parameters or a tuple of
+    a SQL str and its parameters, as returned by `make_filter` & co.
+
+    Examples
+    --------
+    >>> join_filters('TRUE', make_filter('title', 'Home'), make_filter('area', None))
+    ('TRUE\nAND title = ?', ('Home',))
+    """
+    predicates = []
+    parameters = []
+    for sql_filter in filters:
+        if isinstance(sql_filter, tuple):
+            sql_filter, filter_parameters = sql_filter
+            parameters.extend(filter_parameters)
+        if sql_filter:
+            predicates.append(sql_filter)
+    return "\n".join(predicates), tuple(parameters)
+
+
+def get_mtimes(filepath):
+    """
+    Return the modification times of a database and its write-ahead log.
+
+    The time of a missing file is None.
+    """
+    mtimes = []
+    for path in (filepath, f"{filepath}-wal"):
+        try:
+            mtimes.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return tuple(mtimes)
+
+
+def keyed_dict_factory(cursor, row):
+    """
+    Convert SQL result into a `(key, dict)` pair.
+
+    The first column is used as key and is not included in the dict.
+    Useful to group the rows of a batched query.
+    """
+    result = dict_factory(cursor, row)
+    result.pop(cursor.description[0][0], None)
+    return row[0], result
+
+
 def list_factory(_cursor, row):
     """Convert SQL selects of one column into a list."""
     return row[0]
 
 
+def local_midnight_unixtime(day: datetime.date) -> float:
+    """
+    Return the UNIX time at which a day starts in the local timezone.
+
+    Examples
+    --------
+    >>> import time
+    >>> day = datetime.date(2021, 3, 28)
+    >>> local_midnight_unixtime(day) == time.mktime(day.timetuple())
+    True
+    """
+    return datetime.datetime.combine(day, datetime.time()).timestamp()
+
+
 def make_filter(column, value):
     """
-    Return SQL filter 'AND {column} = "{value}"'.
+    Return SQL filter 'AND {column} = ?' and its parameters.
 
-    Special handling if `value` is `bool` or `None`.
+    Special handling if `value` is `bool` or `None`. If `value` is a
+    list or tuple, match any of its elements.
 
     Examples
     --------
     >>> make_filter('title', 'Important')
-    "AND title = 'Important'"
+    ('AND title = ?', ('Important',))
 
     >>> make_filter('startDate', True)
-    'AND startDate IS NOT NULL'
+    ('AND startDate IS NOT NULL', ())
 
     >>> make_filter('startDate', False)
-    'AND startDate IS NULL'
+    ('AND startDate IS NULL', ())
 
     >>> make_filter('title', None)
-    ''
+    ('', ())
+
+    >>> make_filter('uuid', ['A', 'B'])
+    ('AND uuid IN (?, ?)', ('A', 'B'))
+    """
+    if value is None:
+        return "", ()
+    if value is False:
+        return f"AND {column} IS NULL", ()
+    if value is True:
+        return f"AND {column} IS NOT NULL", ()
+
+    if isinstance(value, (list, tuple)):
+        for element in value:
+            validate_string(column, element)
+        return f"AND {column} IN ({make_placeholders(len(value))})", tuple(value)
+
+    validate_string(column, value)
+    return f"AND {column} = ?", (value,)
+
+
+def make_keyset_filter(order_keys, after) -> Tuple[str, tuple]:
+    """
+    Filter tasks that come after the position of a cursor.
+
+    This is used for keyset pagination: instead of skipping rows with
+    OFFSET, the next page starts right after the last task of the
+    previous page, according to `order_keys`. NULL values sort first in
+    ascending order and last in descending order, as in SQLite.
+
+    Parameters
+    ----------
+    order_keys : list of tuple of str and bool
+        Names of `SORT_KEY_COLUMNS` and whether they are sorted in
+        descending order. The last key must be unique, i.e., 'uuid'.
+
+    after : dict or None
+        Values of `SORT_KEY_COLUMNS` of the last task of the previous
+        page, see `decode_cursor`. If None, return the empty string.
+
+    Examples
+    --------
+    >>> make_keyset_filter([('title', True), ('uuid', False)], {'title': 'A', 'uuid': 'B'})
+    ('AND ((TASK.title < ? OR TASK.title IS NULL) OR TASK.title IS ? AND TASK.uuid > ?)', \
+('A', 'A', 'B'))
+    >>> make_keyset_filter([('deadline', False), ('uuid', False)], {'deadline': None, 'uuid': 'B'})
+    ('AND (TASK.deadline IS NOT NULL OR TASK.deadline IS ? AND TASK.uuid > ?)', (None, 'B'))
+    >>> make_keyset_filter([('uuid', False)], None)
+    ('', ())
+    """
+    if after is None:
+        return "", ()
+
+    clauses = []
+    parameters: List[Any] = []
+    equal_conditions: List[str] = []
+    equal_parameters: List[Any] = []
+    for name, descending in order_keys:
+        expression = SORT_KEY_COLUMNS[name]
+        value = after[name]
+        if value is None:
+            greater = "FALSE" if descending else f"{expression} IS NOT NULL"
+        elif descending:
+            greater = f"({expression} < ? OR {expression} IS NULL)"
+        else:
+            greater = f"{expression} > ?"
+        clauses.append(" AND ".join([*equal_conditions, greater]))
+        parameters += equal_parameters
+        parameters += [] if value is None else [value]
+        equal_conditions.append(f"{expression} IS ?")
+        equal_parameters.append(value)
+
+    return f"AND ({' OR '.join(clauses)})", tuple(parameters)
+
+
+def make_order_keys(index, today, order_bys, paged):
     """
-    default = f"AND {column} = '{escape_string(str(value))}'"
-    return {
-        None: "",
-        False: f"AND {column} IS NULL",
-        True: f"AND {column} IS NOT NULL",
-    }.get(value, default)
+    Return the sort keys of a task query.
+
+    Each key is a pair of a name of `SORT_KEY_COLUMNS` and whether to
+    sort in descending order. See `Database.get_tasks` for the
+    parameters. `paged` indicates that `limit` or `after` is given.
+
+    Examples
+    --------
+    >>> make_order_keys('index', False, ['-stop_date'], False)
+    [('stop_date', True), ('index', False), ('uuid', False)]
+    """
+    order_keys = [("today_index" if index == "todayIndex" else "index", False)]
+    if today:
+        # Order of the Today view: by today index and start date, with
+        # regular tasks before predicted ones.
+        order_keys = [
+            ("today_index", False),
+            ("start_date", False),
+            ("someday", False),
+            ("index", False),
+        ]
+
+    order_bys = [value for value in order_bys if value]
+    if order_bys:
+        order_keys = [(value.lstrip("-"), value.startswith("-")) for value in order_bys]
+        order_keys.append(("index", False))
+    if order_bys or paged:
+        # Make the order unique, so that pages neither overlap nor miss tasks.
+        order_keys.append(("uuid", False))
+    return order_keys
 
 
 def make_or_filter(*filters):
-    """Join filters with OR."""
-    filters = filter(None, filters)  # type: ignore
-    filters = [remove_prefix(filter, "AND ") for filter in filters]  # type: ignore
-    filters = " OR ".join(filters)  # type: ignore
-    return f"AND ({filters})" if filters else ""
+    """
+    Join filters with OR.
+
+    Examples
+    --------
+    >>> make_or_filter(make_filter('project', 'A'), make_filter('heading', 'A'))
+    ('AND (project = ? OR heading = ?)', ('A', 'A'))
+    """
+    predicates = []
+    parameters = []
+    for sql_filter, filter_parameters in filters:
+        if sql_filter:
+            predicates.append(remove_prefix(sql_filter, "AND "))
+            parameters.extend(filter_parameters)
+    predicate = " OR ".join(predicates)
+    return (f"AND ({predicate})" if predicate else ""), tuple(parameters)
+
+
+def make_placeholders(count):
+    """
+    Return a comma-separated list of `count` SQL parameter tokens.
+
+    Examples
+    --------
+    >>> make_placeholders(3)
+    '?, ?, ?'
+    """
+    return ", ".join("?" * count)
+
+
+@functools.lru_cache(maxsize=None)
+def make_record_type(name, fields):
+    """
+    Return a `Record` type with the given fields.
+
+    Examples
+    --------
+    >>> Tag = make_record_type('Tag', ('uuid', 'title', 'tags'))
+    >>> tag = Tag('H96sVJwE7VJveAnv7itmux', 'Errand', 1)
+    >>> tag.title, tag['tags']
+    ('Errand', True)
+    """
+    namespace = {"__slots__": ()}
+    for index, field in enumerate(fields):
+        if field in COLUMNS_TO_TRANSFORM_TO_BOOL:
+            namespace[field] = property(
+                functools.partial(get_bool_field, index=index),
+                doc=f"Alias for field number {index}, as bool if set.",
+            )
+    return type(name, (Record, namedtuple(name, fields)), namespace)
 
 
-def make_search_filter(query: Optional[str]) -> str:
+def make_search_filter(query: Optional[str]) -> Tuple[str, tuple]:
     """
     Return a SQL filter to search tasks by a string query.
 
     Example:
     --------
     >>> make_search_filter('dinner')
-    "AND (TASK.title LIKE '%dinner%' OR TASK.notes LIKE '%dinner%' OR \
-    AREA.title LIKE '%dinner%')"
+    ('AND (TASK.title LIKE ? OR TASK.notes LIKE ? OR AREA.title LIKE ?)', \
+    ('%dinner%', '%dinner%', '%dinner%'))
     """
     if not query:
-        return ""
+        return "", ()
 
-    query = escape_string(query)
+    validate_string("search_query", query)
 
     # noqa todo 'TMChecklistItem.title'
     columns = ["TASK.title", "TASK.notes", "AREA.title"]
 
-    sub_searches = (f"{column} LIKE '%{query}%'" for column in columns)
+    sub_searches = (f"{column} LIKE ?" for column in columns)
+
+    return f"AND ({' OR '.join(sub_searches)})", (f"%{query}%",) * len(columns)
+
+
+def make_tag_filter(link_table, link_column, uuid_column, tag):
+    """
+    Filter by tag title with a semi-join.
+
+    Unlike joining the tags and filtering on `TAG.title`, this does not
+    multiply the rows of items with several tags.
+
+    Parameters
+    ----------
+    link_table : str
+        Table linking items to tags, e.g., `TMTaskTag`.
+
+    link_column : str
+        Column of `link_table` referring to the item, e.g., 'tasks'.
+
+    uuid_column : str
+        Column of the item's uuid in the query, e.g., 'TASK.uuid'.
+
+    tag : str, bool, list of str, or None
+        - `tag == False`, only include items _without_ tags.
+        - `tag == True`, only include items _with_ tags.
+        - Any other value is matched with the tag title, see `make_filter`.
+        - `tag == None`, do not filter.
+
+    Examples
+    --------
+    >>> make_tag_filter('TMAreaTag', 'areas', 'AREA.uuid', 'Home')
+    ('AND EXISTS (SELECT 1 FROM TMAreaTag AS LINK JOIN TMTag AS TAG ON \
+TAG.uuid = LINK.tags WHERE LINK.areas = AREA.uuid AND TAG.title = ?)', ('Home',))
+    >>> make_tag_filter('TMAreaTag', 'areas', 'AREA.uuid', None)
+    ('', ())
+    """
+    if tag is None:
+        return "", ()
+
+    title_filter, parameters = "", ()
+    if not isinstance(tag, bool):
+        title_filter, parameters = make_filter("TAG.title", tag)
+    exists = (
+        f"EXISTS (SELECT 1 FROM {link_table} AS LINK "
+        f"JOIN {TABLE_TAG} AS TAG ON TAG.uuid = LINK.tags "
+        f"WHERE LINK.{link_column} = {uuid_column} {title_filter})"
+    )
+    if tag is False:
+        return f"AND NOT {exists}", parameters
+    return f"AND {exists}", parameters
+
 
-    return f"AND ({' OR '.join(sub_searches)})"
+@functools.lru_cache(maxsize=None)
+def make_task_columns():
+    """
+    Return the columns of a task query, keyed by field name.
 
+    Examples
+    --------
+    >>> make_task_columns()['title']
+    'TASK.title'
+    >>> make_task_columns()['today_index']
+    'TASK.todayIndex AS today_index'
+    """
+    start_date_expression = convert_thingsdate_sql_expression_to_isodate(
+        f"TASK.{DATE_START}"
+    )
+    deadline_expression = convert_thingsdate_sql_expression_to_isodate(
+        f"TASK.{DATE_DEADLINE}"
+    )
+    reminder_time_expression = convert_thingstime_sql_expression_to_isotime(
+        f"TASK.{REMINDER_TIME}"
+    )
 
-def make_thingsdate_filter(date_column: str, value) -> str:
+    # The tags and checklist flags are computed with EXISTS subqueries
+    # rather than joins, so that each task results in exactly one row.
+    columns = {
+        "uuid": "TASK.uuid",
+        "type": f"""CASE
+                    WHEN TASK.{IS_TODO} THEN 'to-do'
+                    WHEN TASK.{IS_PROJECT} THEN 'project'
+                    WHEN TASK.{IS_HEADING} THEN 'heading'
+                END AS type""",
+        "trashed": f"""CASE
+                    WHEN TASK.{IS_TRASHED} THEN 1
+                END AS trashed""",
+        "title": "TASK.title",
+        "status": f"""CASE
+                    WHEN TASK.{IS_INCOMPLETE} THEN 'incomplete'
+                    WHEN TASK.{IS_CANCELED} THEN 'canceled'
+                    WHEN TASK.{IS_COMPLETED} THEN 'completed'
+                END AS status""",
+        "area": """CASE
+                    WHEN AREA.uuid IS NOT NULL THEN AREA.uuid
+                END AS area""",
+        "area_title": """CASE
+                    WHEN AREA.uuid IS NOT NULL THEN AREA.title
+                END AS area_title""",
+        "project": """CASE
+                    WHEN PROJECT.uuid IS NOT NULL THEN PROJECT.uuid
+                END AS project""",
+        "project_title": """CASE
+                    WHEN PROJECT.uuid IS NOT NULL THEN PROJECT.title
+                END AS project_title""",
+        "heading": """CASE
+                    WHEN HEADING.uuid IS NOT NULL THEN HEADING.uuid
+                END AS heading""",
+        "heading_title": """CASE
+                    WHEN HEADING.uuid IS NOT NULL THEN HEADING.title
+                END AS heading_title""",
+        "notes": "TASK.notes",
+        "tags": f"""CASE
+                    WHEN EXISTS (
+                        SELECT 1 FROM {TABLE_TASKTAG} TAGS
+                        JOIN {TABLE_TAG} TAG ON TAGS.tags = TAG.uuid
+                        WHERE TAGS.tasks = TASK.uuid
+                    ) THEN 1
+                END AS tags""",
+        "start": f"""CASE
+                    WHEN TASK.{IS_INBOX} THEN 'Inbox'
+                    WHEN TASK.{IS_ANYTIME} THEN 'Anytime'
+                    WHEN TASK.{IS_SOMEDAY} THEN 'Someday'
+                END AS start""",
+        "checklist": f"""CASE
+                    WHEN EXISTS (
+                        SELECT 1 FROM {TABLE_CHECKLIST_ITEM} CHECKLIST_ITEM
+                        WHERE CHECKLIST_ITEM.task = TASK.uuid
+                    ) THEN 1
+                END AS checklist""",
+        "start_date": f"{start_date_expression} AS start_date",
+        "deadline": f"{deadline_expression} AS deadline",
+        "reminder_time": f'{reminder_time_expression} AS "reminder_time"',
+        "stop_date": f'datetime(TASK.{DATE_STOP}, "unixepoch", "localtime") AS "stop_date"',
+        "created": f'datetime(TASK.{DATE_CREATED}, "unixepoch", "localtime") AS created',
+        "modified": f'datetime(TASK.{DATE_MODIFIED}, "unixepoch", "localtime") AS modified',
+        "index": "TASK.'index'",
+        "today_index": "TASK.todayIndex AS today_index",
+    }
+    return columns
+
+
+def make_thingsdate_filter(date_column: str, value) -> Tuple[str, tuple]:
     """
     Return a SQL filter for "Things date" columns.
 
@@ -902,38 +1935,38 @@ def make_thingsdate_filter(date_column: str, value) -> str:
 
     Returns
     -------
-    str
-        A date filter for the SQL query. If `value == None`, then
-        return the empty string.
+    tuple of str and tuple
+        A date filter for the SQL query and its parameters.
+        If `value == None`, then return the empty string.
 
     Examples
     --------
     >>> make_thingsdate_filter('startDate', True)
-    'AND startDate IS NOT NULL'
+    ('AND startDate IS NOT NULL', ())
 
     >>> make_thingsdate_filter('startDate', False)
-    'AND startDate IS NULL'
+    ('AND startDate IS NULL', ())
 
     >>> make_thingsdate_filter('startDate', 'future')
-    "AND startDate > ((strftime('%Y', date('now', 'localtime')) << 16) \
+    ("AND startDate > ((strftime('%Y', date('now', 'localtime')) << 16) \
     | (strftime('%m', date('now', 'localtime')) << 12) \
-    | (strftime('%d', date('now', 'localtime')) << 7))"
+    | (strftime('%d', date('now', 'localtime')) << 7))", ())
 
     >>> make_thingsdate_filter('deadline', '2021-03-28')
-    'AND deadline == 132464128'
+    ('AND deadline == ?', (132464128,))
 
     >>> make_thingsdate_filter('deadline', '=2021-03-28')
-    'AND deadline = 132464128'
+    ('AND deadline = ?', (132464128,))
 
     >>> make_thingsdate_filter('deadline', '<=2021-03-28')
-    'AND deadline <= 132464128'
+    ('AND deadline <= ?', (132464128,))
 
     >>> make_thingsdate_filter('deadline', None)
-    ''
+    ('', ())
 
     """
     if value is None:
-        return ""
+        return "", ()
 
     if isinstance(value, bool):
         return make_filter(date_column, value)
@@ -945,16 +1978,44 @@ def make_thingsdate_filter(date_column: str, value) -> str:
         if not comparator:
             comparator = "=="
         thingsdate = isodate_to_yyyyyyyyyyymmmmddddd(isodate)
-        threshold = str(thingsdate)
-    else:
-        # "future" or "past"
-        validate("value", value, ["future", "past"])
-        threshold = convert_isodate_sql_expression_to_thingsdate(
-            "date('now', 'localtime')", null_possible=False
-        )
-        comparator = ">" if value == "future" else "<="
+        return f"AND {date_column} {comparator} ?", (thingsdate,)
 
-    return f"AND {date_column} {comparator} {threshold}"
+    # "future" or "past"
+    validate("value", value, ["future", "past"])
+    threshold = convert_isodate_sql_expression_to_thingsdate(
+        "date('now', 'localtime')", null_possible=False
+    )
+    comparator = ">" if value == "future" else "<="
+
+    return f"AND {date_column} {comparator} {threshold}", ()
+
+
+def make_today_filter() -> Tuple[str, tuple]:
+    """
+    Filter tasks shown in Today, including predicted ones.
+
+    The Things database reflects the state of the app when it was last
+    opened. Besides the regular Today tasks, this also matches the tasks
+    that would move to Today if the app were opened now, indicated by a
+    yellow dot in the app: scheduled tasks whose start date has passed,
+    and tasks without start date whose deadline has passed and has not
+    been suppressed.
+    """
+    start_date_filter, start_date_parameters = make_thingsdate_filter(
+        f"TASK.{DATE_START}", "past"
+    )
+    deadline_filter, deadline_parameters = make_thingsdate_filter(
+        f"TASK.{DATE_DEADLINE}", "past"
+    )
+    sql_filter = f"""AND (
+        (TASK.{IS_ANYTIME} AND TASK.{DATE_START} IS NOT NULL)
+        OR (TASK.{IS_SOMEDAY} {start_date_filter})
+        OR (
+            TASK.{DATE_START} IS NULL {deadline_filter}
+            AND TASK.deadlineSuppressionDate IS NULL
+        )
+    )"""
+    return sql_filter, start_date_parameters + deadline_parameters
 
 
 def make_truthy_filter(column: str, value) -> str:
@@ -986,7 +2047,7 @@ def make_truthy_filter(column: str, value) -> str:
     return f"AND NOT IFNULL({column}, 0)"
 
 
-def make_unixtime_filter(date_column: str, value) -> str:
+def make_unixtime_filter(date_column: str, value) -> Tuple[str, tuple]:
     """
     Return a SQL filter for UNIX time columns.
 
@@ -1007,59 +2068,71 @@ def make_unixtime_filter(date_column: str, value) -> str:
 
     Returns
     -------
-    str
-        A date filter for the SQL query. If `value == None`, then
-        return the empty string.
+    tuple of str and tuple
+        A date filter for the SQL query and its parameters.
+        If `value == None`, then return the empty string.
 
     Examples
     --------
     >>> make_unixtime_filter('stopDate', True)
-    'AND stopDate IS NOT NULL'
+    ('AND stopDate IS NOT NULL', ())
 
     >>> make_unixtime_filter('stopDate', False)
-    'AND stopDate IS NULL'
+    ('AND stopDate IS NULL', ())
 
     >>> make_unixtime_filter('stopDate', 'future')
-    "AND date(stopDate, 'unixepoch', 'localtime') > date('now', 'localtime')"
+    ('AND stopDate >= ?', (...,))
 
     >>> make_unixtime_filter('creationDate', '2021-03-28')
-    "AND date(creationDate, 'unixepoch', 'localtime') == date('2021-03-28')"
+    ('AND creationDate >= ? AND creationDate < ?', (..., ...))
 
     >>> make_unixtime_filter('creationDate', '=2021-03-28')
-    "AND date(creationDate, 'unixepoch', 'localtime') = date('2021-03-28')"
+    ('AND creationDate >= ? AND creationDate < ?', (..., ...))
 
     >>> make_unixtime_filter('creationDate', '<=2021-03-28')
-    "AND date(creationDate, 'unixepoch', 'localtime') <= date('2021-03-28')"
+    ('AND creationDate < ?', (...,))
 
     >>> make_unixtime_filter('creationDate', None)
-    ''
+    ('', ())
 
     """
     if value is None:
-        return ""
+        return "", ()
 
     if isinstance(value, bool):
         return make_filter(date_column, value)
 
-    # Check for ISO 8601 date str + optional operator
+    # The column is compared as is, so that SQLite can use an index on it.
+    # For that, the local day is translated into a range of UNIX times.
     match = match_date(value)
     if match:
         comparator, isodate = match.groups()
-        if not comparator:
-            comparator = "=="
-        threshold = f"date('{isodate}')"
+        day = datetime.date.fromisoformat(isodate)
     else:
         # "future" or "past"
         validate("value", value, ["future", "past"])
-        threshold = "date('now', 'localtime')"
         comparator = ">" if value == "future" else "<="
+        day = datetime.date.today()
+
+    day_start = local_midnight_unixtime(day)
+    day_end = local_midnight_unixtime(day + datetime.timedelta(days=1))
 
-    date = f"date({date_column}, 'unixepoch', 'localtime')"
+    if comparator in (None, "=", "=="):
+        return (
+            f"AND {date_column} >= ? AND {date_column} < ?",
+            (day_start, day_end),
+        )
 
-    return f"AND {date} {comparator} {threshold}"
+    column_filter, threshold = {
+        "<": (f"AND {date_column} < ?", day_start),
+        "<=": (f"AND {date_column} < ?", day_end),
+        ">": (f"AND {date_column} >= ?", day_end),
+        ">=": (f"AND {date_column} >= ?", day_start),
+    }[comparator]
+    return column_filter, (threshold,)
 
 
-def make_unixtime_range_filter(date_column: str, offset) -> str:
+def make_unixtime_range_filter(date_column: str, offset) -> Tuple[str, tuple]:
     """
     Return a SQL filter to limit a Unix time to last X days, weeks, or years.
 
@@ -1077,38 +2150,41 @@ def make_unixtime_range_filter(date_column: str, offset) -> str:
 
     Returns
     -------
-    str
-        A date filter for the SQL query. If `offset == None`, then
-        return the empty string.
+    tuple of str and tuple
+        A date filter for the SQL query and its parameters.
+        If `offset == None`, then return the empty string.
 
     Examples
     --------
     >>> make_unixtime_range_filter('creationDate', '3d')
-    "AND datetime(creationDate, 'unixepoch', 'localtime') > datetime('now', '-3 days')"
+    ('AND creationDate > ?', (...,))
 
     >>> make_unixtime_range_filter('creationDate', None)
-    ''
+    ('', ())
     """
     if offset is None:
-        return ""
+        return "", ()
 
     validate_offset("offset", offset)
     number, suffix = int(offset[:-1]), offset[-1]
+    now = datetime.datetime.now(datetime.timezone.utc)
 
     if suffix == "d":
-        modifier = f"-{number} days"
+        threshold = now - datetime.timedelta(days=number)
     elif suffix == "w":
-        modifier = f"-{number * 7} days"
+        threshold = now - datetime.timedelta(weeks=number)
     elif suffix == "y":
-        modifier = f"-{number} years"
+        # Like SQLite's '-X years' modifier, Feb 29 overflows to Mar 1.
+        year = now.year - number
+        try:
+            threshold = now.replace(year=year)
+        except ValueError:
+            threshold = now.replace(year=year, month=3, day=1)
     else:
         # Use `typing.assert_never(suffix)` from Python 3.11 onwards.
         raise AssertionError("line should be unreachable.")  # for static code analyzers
 
-    column_datetime = f"datetime({date_column}, 'unixepoch', 'localtime')"
-    offset_datetime = f"datetime('now', '{modifier}')"
-
-    return f"AND {column_datetime} > {offset_datetime}"
+    return f"AND {date_column} > ?", (threshold.timestamp(),)
 
 
 def match_date(value):
@@ -1124,11 +2200,34 @@ def prettify_sql(sql_query):
     return re.sub(r"^$\n", "", result, flags=re.MULTILINE)
 
 
+def release_connection(connection, connections, lock):
+    """Close a SQLite connection and remove it from `connections`."""
+    with lock:
+        if connection in connections:
+            connections.remove(connection)
+    connection.close()
+
+
 def remove_prefix(text, prefix):
     """Remove prefix from text (as removeprefix() is 3.9+ only)."""
     return text[text.startswith(prefix) and len(prefix) :]
 
 
+def resolve_filepath(filepath=None):
+    """
+    Return the database filepath to use.
+
+    In order of precedence: `filepath`, the environment variable
+    `THINGSDB`, and the default database path.
+    """
+    return filepath or os.getenv(ENVIRONMENT_VARIABLE_WITH_FILEPATH) or DEFAULT_FILEPATH
+
+
+def tuple_factory(_cursor, row):
+    """Return SQL result rows as plain tuples."""
+    return row
+
+
 def validate(parameter, argument, valid_arguments):
     """
     For a given parameter, check if its argument type is valid.
@@ -1161,6 +2260,30 @@ def validate(parameter, argument, valid_arguments):
     raise ValueError(message)
 
 
+def validate_string(parameter, argument):
+    r"""
+    For a given parameter, check that a str argument has no null characters.
+
+    Null characters within strings can lead to surprising behavior,
+    so raise `ValueError` instead.
+
+    Examples
+    --------
+    >>> validate_string(parameter='title', argument='Home')
+
+    >>> validate_string(parameter='title', argument='Ho\0me')
+    Traceback (most recent call last):
+    ...
+    ValueError: Invalid title argument: 'Ho\x00me'
+    Null characters are not supported.
+    """
+    if isinstance(argument, str) and "\0" in argument:
+        raise ValueError(
+            f"Invalid {parameter} argument: {argument!r}\n"
+            "Null characters are not supported."
+        )
+
+
 def validate_date(parameter, argument):
     """
     For a given date parameter, check if its argument is valid.
@@ -1210,6 +2333,56 @@ def validate_date(parameter, argument):
         ) from error
 
 
+def validate_fields(fields):
+    """
+    Validate the `fields` of a task query and return them as a list.
+
+    Examples
+    --------
+    >>> validate_fields('title')
+    ['title']
+    >>> validate_fields(['uuid', 'status'])
+    ['uuid', 'status']
+    >>> validate_fields(None)
+    >>> validate_fields(['titel'])
+    Traceback (most recent call last):
+    ...
+    ValueError: Unrecognized fields type: 'titel'
+    Valid fields types are [...]
+    """
+    if fields is None:
+        return None
+    fields = [fields] if isinstance(fields, str) else list(fields)
+    for field in fields:
+        validate("fields", field, list(make_task_columns()))
+    return fields
+
+
+def validate_limit(parameter, argument):
+    """
+    For a given limit parameter, check if its argument is valid.
+
+    If not, then raise `ValueError`.
+
+    Examples
+    --------
+    >>> validate_limit(parameter='limit', argument=None)
+    >>> validate_limit(parameter='limit', argument=10)
+    >>> validate_limit(parameter='limit', argument=-1)
+    Traceback (most recent call last):
+    ...
+    ValueError: Invalid limit argument: -1
+    Please specify a non-negative integer or None.
+    """
+    if argument is None:
+        return
+    if isinstance(argument, bool) or not isinstance(argument, int) or argument < 0:
+        raise ValueError(
+            f"Invalid {parameter} argument: {argument!r}\n"
+            f"Please specify a non-negative integer or None."
+        )
+
+
 def validate_offset(parameter, argument):
     """
     For a given offset parameter, check if its argument is valid.
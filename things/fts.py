@@ -0,0 +1,336 @@
+"""Full-text search index for Things tasks using SQLite FTS5."""
+
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+from typing import Dict, List, Optional
+import weakref
+
+from things.database import (
+    DATE_MODIFIED,
+    TABLE_AREA,
+    TABLE_CHECKLIST_ITEM,
+    TABLE_TAG,
+    TABLE_TASK,
+    TABLE_TASKTAG,
+    Database,
+    chunked,
+    make_placeholders,
+    tuple_factory,
+)
+
+
+TABLE_TOMBSTONE = "TMTombstone"
+
+# Relative weights of the indexed columns for BM25 ranking.
+# The first value belongs to the unindexed `uuid` column.
+COLUMN_WEIGHTS = (0.0, 10.0, 1.0, 2.0, 2.0, 5.0)
+
+# Search indexes already opened, keyed by filepath. See `SearchIndex.find`.
+_SEARCH_INDEXES: Dict[str, "SearchIndex"] = {}
+_SEARCH_INDEXES_LOCK = threading.Lock()
+
+
+class SearchIndex:
+    """
+    Full-text search index of the tasks of a Things database.
+
+    The Things database is opened read-only, so the index is kept in a
+    separate SQLite database, the _sidecar_. It covers titles and notes
+    of tasks, the titles of their checklist items, the titles of their
+    area, project, and heading, and their tag names.
+
+    `sync` builds the index on first use and afterwards only reindexes
+    tasks changed since the last sync, based on `userModificationDate`
+    and the tombstones of deleted tasks.
+
+    An index can be shared between threads.
+
+    Parameters
+    ----------
+    filepath : str
+        Path of the sidecar database. `find` uses a path in the user's
+        cache directory, see `default_filepath`.
+
+    Examples
+    --------
+    >>> index = SearchIndex(':memory:')
+    >>> index.sync(things.Database())
+    50
+    >>> index.search('To-Do in Heading')
+    ['...', '...', '...']
+    """
+
+    def __init__(self, filepath: str):
+        """Open or create the sidecar database."""
+        self.filepath = filepath
+        if filepath != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+        self.connection = sqlite3.connect(filepath, check_same_thread=False)
+        weakref.finalize(self, sqlite3.Connection.close, self.connection)
+        self._lock = threading.Lock()
+        # Database versions at the last sync, see `Database.get_data_version`.
+        self._synced_versions: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+        with self.connection:
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value
+                );
+                CREATE TABLE IF NOT EXISTS documents (
+                    rowid INTEGER PRIMARY KEY,
+                    uuid TEXT UNIQUE NOT NULL
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS task_search USING fts5(
+                    uuid UNINDEXED,
+                    title,
+                    notes,
+                    checklist,
+                    context,
+                    tags,
+                    tokenize = 'unicode61 remove_diacritics 2',
+                    prefix = '2 3'
+                );
+                """)
+
+    @classmethod
+    def find(cls, database: Database, create=False) -> Optional["SearchIndex"]:
+        """
+        Return the index of `database` at its default location.
+
+        If it has not been built before, return None, or create and
+        build it if `create == True`.
+        """
+        filepath = default_filepath(database.filepath)
+        with _SEARCH_INDEXES_LOCK:
+            index = _SEARCH_INDEXES.get(filepath)
+            if index is None:
+                if not create and not os.path.exists(filepath):
+                    return None
+                index = _SEARCH_INDEXES[filepath] = cls(filepath)
+        if create:
+            index.sync(database)
+        return index
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[str]:
+        """
+        Return uuids of tasks matching `query`, best matches first.
+
+        Every word of `query` has to match the beginning of a word in
+        the task, e.g., 'din pla' matches 'Plan dinner'. Call `sync`
+        first to take recent changes into account.
+        """
+        fts_query = make_fts_query(query)
+        if not fts_query:
+            return []
+
+        weights = ", ".join(map(str, COLUMN_WEIGHTS))
+        sql_query = f"""
+            SELECT
+                documents.uuid
+            FROM
+                task_search
+            JOIN
+                documents ON documents.rowid = task_search.rowid
+            WHERE
+                task_search MATCH ?
+            ORDER BY bm25(task_search, {weights})
+            LIMIT ?
+            """
+        with self._lock:
+            rows = self.connection.execute(sql_query, (fts_query, limit or -1))
+            return [uuid for uuid, in rows]
+
+    def sync(self, database: Database) -> int:
+        """
+        Update the index with changes of the Things database.
+
+        Return the number of (re)indexed tasks.
+        """
+        version = database.get_data_version()
+        if self._synced_versions.get(database) == version:
+            return 0
+
+        with self._lock:
+            # Read the watermark first, so that no change slips through.
+            watermark = get_watermark(database)
+            fingerprint = get_fingerprint(database)
+            last_watermark = self._get_meta("watermark")
+
+            if last_watermark is None or fingerprint != self._get_meta("fingerprint"):
+                # Renamed areas and tags do not leave a modification date.
+                with self.connection:
+                    self.connection.execute("DELETE FROM documents")
+                    self.connection.execute("DELETE FROM task_search")
+                count = self._index_tasks(database, "TRUE")
+            else:
+                self._delete_tasks(get_deleted_uuids(database, last_watermark))
+                count = 0
+                for uuids in chunked(get_changed_uuids(database, last_watermark)):
+                    count += self._index_tasks(
+                        database,
+                        f"TASK.uuid IN ({make_placeholders(len(uuids))})",
+                        tuple(uuids),
+                    )
+
+            with self.connection:
+                self._set_meta("watermark", watermark)
+                self._set_meta("fingerprint", fingerprint)
+
+        self._synced_versions[database] = version
+        return count
+
+    def _index_tasks(self, database, where_predicate, parameters=()) -> int:
+        """(Re)index the tasks matching `where_predicate`."""
+        sql_query = f"""
+            SELECT
+                TASK.uuid,
+                TASK.title,
+                TASK.notes,
+                (
+                    SELECT group_concat(CHECKLIST_ITEM.title, ' ')
+                    FROM {TABLE_CHECKLIST_ITEM} AS CHECKLIST_ITEM
+                    WHERE CHECKLIST_ITEM.task = TASK.uuid
+                ) AS checklist,
+                IFNULL(AREA.title, '') || ' ' ||
+                IFNULL(PROJECT.title, '') || ' ' ||
+                IFNULL(HEADING.title, '') AS context,
+                (
+                    SELECT group_concat(TAG.title, ' ')
+                    FROM {TABLE_TASKTAG} AS TASK_TAG
+                    JOIN {TABLE_TAG} AS TAG ON TAG.uuid = TASK_TAG.tags
+                    WHERE TASK_TAG.tasks = TASK.uuid
+                ) AS tags
+            FROM
+                {TABLE_TASK} AS TASK
+            LEFT OUTER JOIN
+                {TABLE_AREA} AREA ON TASK.area = AREA.uuid
+            LEFT OUTER JOIN
+                {TABLE_TASK} PROJECT ON TASK.project = PROJECT.uuid
+            LEFT OUTER JOIN
+                {TABLE_TASK} HEADING ON TASK.heading = HEADING.uuid
+            WHERE
+                {where_predicate}
+            """
+        rows = database.execute_query(sql_query, parameters, row_factory=tuple_factory)
+        self._delete_tasks([row[0] for row in rows])
+        with self.connection:
+            for row in rows:
+                cursor = self.connection.execute(
+                    "INSERT INTO documents (uuid) VALUES (?)", (row[0],)
+                )
+                self.connection.execute(
+                    "INSERT INTO task_search (rowid, uuid, title, notes, checklist, "
+                    "context, tags) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (cursor.lastrowid, *row),
+                )
+        return len(rows)
+
+    def _delete_tasks(self, uuids):
+        """Remove tasks from the index."""
+        with self.connection:
+            for chunk in chunked(uuids):
+                placeholders = make_placeholders(len(chunk))
+                self.connection.execute(
+                    "DELETE FROM task_search WHERE rowid IN ("
+                    f"SELECT rowid FROM documents WHERE uuid IN ({placeholders}))",
+                    chunk,
+                )
+                self.connection.execute(
+                    f"DELETE FROM documents WHERE uuid IN ({placeholders})", chunk
+                )
+
+    def _get_meta(self, key):
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+        )
+
+
+def default_filepath(database_filepath: str) -> str:
+    """
+    Return the default sidecar path for a Things database.
+
+    The index lives in the user's cache directory, one file per database.
+    """
+    cache_directory = os.getenv("XDG_CACHE_HOME") or os.path.expanduser(
+        "~/Library/Caches" if sys.platform == "darwin" else "~/.cache"
+    )
+    digest = hashlib.sha1(os.path.realpath(database_filepath).encode()).hexdigest()
+    return os.path.join(cache_directory, "things.py", f"search-{digest}.sqlite")
+
+
+def get_changed_uuids(database: Database, since: float) -> List[str]:
+    """Return uuids of tasks that need to be reindexed after `since`."""
+    # Changed projects and headings change the context of their tasks.
+    sql_query = f"""
+        WITH CHANGED AS (
+            SELECT uuid FROM {TABLE_TASK} WHERE {DATE_MODIFIED} >= ?
+            UNION
+            SELECT task FROM {TABLE_CHECKLIST_ITEM} WHERE {DATE_MODIFIED} >= ?
+        )
+        SELECT uuid FROM CHANGED
+        UNION
+        SELECT uuid FROM {TABLE_TASK}
+        WHERE project IN CHANGED OR heading IN CHANGED
+        """
+    rows = database.execute_query(sql_query, (since, since), row_factory=tuple_factory)
+    return [uuid for uuid, in rows]
+
+
+def get_deleted_uuids(database: Database, since: float) -> List[str]:
+    """Return uuids of objects deleted after `since`."""
+    sql_query = f"""
+        SELECT deletedObjectUUID FROM {TABLE_TOMBSTONE}
+        WHERE deletionDate >= ?
+        """
+    rows = database.execute_query(sql_query, (since,), row_factory=tuple_factory)
+    return [uuid for uuid, in rows]
+
+
+def get_fingerprint(database: Database) -> str:
+    """Return a hash of all area and tag titles."""
+    sql_query = f"""
+        SELECT uuid, title FROM {TABLE_AREA}
+        UNION ALL
+        SELECT uuid, title FROM {TABLE_TAG}
+        """
+    rows = database.execute_query(sql_query, row_factory=tuple_factory)
+    return hashlib.sha1(repr(sorted(rows)).encode()).hexdigest()
+
+
+def get_watermark(database: Database) -> float:
+    """Return the time of the latest change in the Things database."""
+    sql_query = f"""
+        SELECT IFNULL(MAX(value), 0) FROM (
+            SELECT MAX({DATE_MODIFIED}) AS value FROM {TABLE_TASK}
+            UNION ALL
+            SELECT MAX({DATE_MODIFIED}) FROM {TABLE_CHECKLIST_ITEM}
+            UNION ALL
+            SELECT MAX(deletionDate) FROM {TABLE_TOMBSTONE}
+        )
+        """
+    return database.execute_query(sql_query, row_factory=tuple_factory)[0][0]
+
+
+def make_fts_query(query: str) -> str:
+    """
+    Return a FTS5 query matching all words of `query` as prefixes.
+
+    Examples
+    --------
+    >>> make_fts_query('din pla')
+    '"din"* "pla"*'
+    >>> make_fts_query('  ')
+    ''
+    """
+    terms = (term.replace('"', '""') for term in query.split())
+    return " ".join(f'"{term}"*' for term in terms)
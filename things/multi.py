@@ -0,0 +1,134 @@
+"""Run the same query on many Things databases in parallel."""
+
+from collections import namedtuple
+import concurrent.futures
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+from things import api
+from things.database import Database, validate
+
+
+# Functions of `things.api` that can be given by name.
+FUNCTIONS = (
+    "anytime",
+    "areas",
+    "canceled",
+    "changes",
+    "checklist_items",
+    "completed",
+    "deadlines",
+    "get",
+    "get_many",
+    "inbox",
+    "last",
+    "logbook",
+    "projects",
+    "search",
+    "someday",
+    "tags",
+    "tasks",
+    "today",
+    "todos",
+    "token",
+    "trash",
+    "upcoming",
+)
+
+Result = namedtuple("Result", ["filepath", "value", "error"])
+Result.__doc__ = """
+Result of a query on one database.
+
+`value` is the return value of the query, or None if it raised an
+exception. The exception is then stored in `error`.
+"""
+
+
+def run(  # pylint: disable=R0913
+    filepaths: Iterable[str],
+    function: Union[str, Callable],
+    *args,
+    max_workers: Optional[int] = None,
+    processes: bool = False,
+    **kwargs,
+) -> Iterator[Result]:
+    """
+    Run a query on each of many databases and yield the results.
+
+    Every database is opened, queried, and closed by a worker of a
+    thread or process pool. Results are yielded as soon as they are
+    available, so not necessarily in the order of `filepaths`. A query
+    that fails, e.g., because a file is missing, yields a result with
+    the exception instead of stopping the others.
+
+    Parameters
+    ----------
+    filepaths : iterable of str
+        Paths of SQLite database files generated by the Things app.
+
+    function : str or callable
+        Name of a function of `things.api`, e.g., 'today', see
+        `FUNCTIONS`, or a function accepting a `database` argument.
+        With `processes=True`, it has to be picklable.
+
+    *args, **kwargs
+        Further arguments of `function`, e.g., `last='1w'`.
+
+    max_workers : int, optional
+        Number of databases queried at the same time. Defaults to that
+        of `concurrent.futures.ThreadPoolExecutor` or
+        `concurrent.futures.ProcessPoolExecutor`.
+
+    processes : bool, default False
+        Use a pool of processes instead of threads. This uses several
+        CPU cores for queries that spend much time in Python, e.g.,
+        with `include_items=True`, at the cost of pickling the results.
+
+    Returns
+    -------
+    iterator of things.multi.Result
+
+    Examples
+    --------
+    >>> for result in things.multi.run(filepaths, 'today'):  # doctest: +SKIP
+    ...     print(result.filepath, result.error or len(result.value))
+    >>> things.multi.run(filepaths, 'logbook', last='1w')  # doctest: +SKIP
+    >>> things.multi.run(filepaths, 'tasks', count_only=True)  # doctest: +SKIP
+    """
+    if isinstance(function, str):
+        validate("function", function, list(FUNCTIONS))
+    executor_class = (
+        concurrent.futures.ProcessPoolExecutor
+        if processes
+        else concurrent.futures.ThreadPoolExecutor
+    )
+    executor = executor_class(max_workers=max_workers)
+    futures = {
+        executor.submit(query, filepath, function, args, kwargs): filepath
+        for filepath in filepaths
+    }
+    return iter_results(executor, futures)
+
+
+def iter_results(executor, futures) -> Iterator[Result]:
+    """Yield the results of `futures` as they complete."""
+    try:
+        for future in concurrent.futures.as_completed(futures):
+            error = future.exception()
+            value = None if error else future.result()
+            yield Result(futures[future], value, error)
+    finally:
+        # Stop early if the caller does not consume all results.
+        for future in futures:
+            future.cancel()
+        executor.shutdown()
+
+
+def query(filepath, function, args, kwargs):
+    """Open a database, run `function` on it, and close it again."""
+    if isinstance(function, str):
+        function = getattr(api, function)
+    database = Database(filepath=filepath)
+    try:
+        return function(*args, database=database, **kwargs)
+    finally:
+        database.close()
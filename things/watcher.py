@@ -0,0 +1,158 @@
+"""Watch a Things database for changes."""
+
+import asyncio
+from collections import namedtuple
+import sqlite3
+import threading
+import time
+import traceback
+from typing import Callable, List, Optional
+import weakref
+
+from things.database import get_mtimes, resolve_filepath
+
+
+ChangeEvent = namedtuple("ChangeEvent", ["filepath", "data_version", "time"])
+ChangeEvent.__doc__ = """
+Emitted by `Watcher` after the Things app wrote to the database.
+
+`data_version` is the value of `PRAGMA data_version` after the change,
+and `time` the UNIX time at which the change was detected.
+"""
+
+
+class Watcher:  # pylint: disable=R0902
+    """
+    Watch a Things database and emit events when its data changed.
+
+    The modification times of the database and its write-ahead log are
+    polled every `interval` seconds. Only if they changed, the change
+    is confirmed with `PRAGMA data_version` on a connection held by the
+    watcher, so polling an idle database does not run any query.
+    Changes within `debounce` seconds of each other result in a single
+    event.
+
+    Events are passed to callbacks, see `subscribe` and `start`, or
+    yielded by iterating asynchronously over the watcher.
+
+    The file system is polled, as the standard library does not offer
+    file system notifications.
+
+    Parameters
+    ----------
+    filepath : str, optional
+        Path of the database, see `things.database.resolve_filepath`.
+
+    interval : float, default 1.0
+        Seconds between checks of the modification times.
+
+    debounce : float, default 0.5
+        Seconds without further changes before an event is emitted.
+
+    Examples
+    --------
+    >>> with things.watch(print):  # doctest: +SKIP
+    ...     time.sleep(60)
+    >>> async for event in things.watch():  # doctest: +SKIP
+    ...     print(things.today())
+    """
+
+    def __init__(self, filepath=None, interval=1.0, debounce=0.5):
+        """Open a connection and remember the current state."""
+        self.filepath = resolve_filepath(filepath)
+        self.interval = interval
+        self.debounce = debounce
+        self._callbacks: List[Callable[[ChangeEvent], None]] = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        uri = f"file:{self.filepath}?mode=ro"
+        self.connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        weakref.finalize(self, sqlite3.Connection.close, self.connection)
+        self._mtimes = get_mtimes(self.filepath)
+        self._data_version = self._get_data_version()
+        # Monotonic time of the last change not yet emitted.
+        self._changed_at: Optional[float] = None
+
+    def subscribe(self, callback: Callable[[ChangeEvent], None]):
+        """Call `callback` with every event, once the watcher is started."""
+        self._callbacks.append(callback)
+
+    def start(self):
+        """Start polling in a background thread and call the callbacks."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="things.watch", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop polling and close the connection."""
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.connection.close()
+
+    def poll(self) -> Optional[ChangeEvent]:
+        """
+        Check for changes once.
+
+        Return an event if the data changed and no further change
+        happened within `debounce` seconds, otherwise None.
+        """
+        with self._lock:
+            mtimes = get_mtimes(self.filepath)
+            if mtimes != self._mtimes:
+                self._mtimes = mtimes
+                data_version = self._get_data_version()
+                if data_version != self._data_version:
+                    self._data_version = data_version
+                    self._changed_at = time.monotonic()
+
+            if self._changed_at is None:
+                return None
+            if time.monotonic() - self._changed_at < self.debounce:
+                return None
+            self._changed_at = None
+            return ChangeEvent(self.filepath, self._data_version, time.time())
+
+    def get_timeout(self) -> float:
+        """Return the seconds to wait until the next check."""
+        if self._changed_at is None:
+            return self.interval
+        remaining = self._changed_at + self.debounce - time.monotonic()
+        return max(0.0, min(self.interval, remaining))
+
+    def __enter__(self):
+        """Start the watcher, see `start`."""
+        return self.start()
+
+    def __exit__(self, *_exc_info):
+        """Stop the watcher, see `stop`."""
+        self.stop()
+
+    async def __aiter__(self):
+        """Yield events until the watcher is stopped."""
+        while not self._stopped.is_set():
+            event = self.poll()
+            if event is not None:
+                yield event
+            else:
+                await asyncio.sleep(self.get_timeout())
+
+    def _run(self):
+        while not self._stopped.wait(self.get_timeout()):
+            event = self.poll()
+            if event is None:
+                continue
+            for callback in list(self._callbacks):
+                try:
+                    callback(event)
+                except Exception:  # pylint: disable=W0718
+                    # A failing callback must not stop the watcher.
+                    traceback.print_exc()
+
+    def _get_data_version(self):
+        return self.connection.execute("PRAGMA data_version").fetchone()[0]